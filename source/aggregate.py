@@ -0,0 +1,30 @@
+import argparse
+
+from classes.results import aggregate
+
+
+def arguments():
+    parser = argparse.ArgumentParser(
+        description='Aggregates the results of tournaments (cf. the'
+                    ' --results option of main.py).'
+    )
+    parser.add_argument(
+        'results', nargs='+',
+        help='Results files, CSV (.csv) or JSON lines'
+    )
+    parser.add_argument(
+        '--chunksize', default=100_000, type=int,
+        help='Records read at once (default: 100000)'
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    args = arguments()
+    summary = aggregate(args.results, chunksize=args.chunksize)
+    with pd.option_context("display.width", None,
+                           "display.max_columns", None,
+                           "display.float_format", "{:.4g}".format):
+        print(summary.to_string(index=False))
@@ -0,0 +1,215 @@
+"""
+Throughput of the hot paths of the program: the logic primitives, a
+full random game and the nodes per second of the search strategies.
+
+Every benchmark runs on fixed seeded positions, for each board size,
+and reports a rate (higher is better). Results can be saved as JSON
+and compared against a previous run. Run from the `source` directory:
+
+    $ python benchmarks/bench.py --json baseline.json
+    $ python benchmarks/bench.py --baseline baseline.json
+
+The comparison exits with status 1 if a rate dropped by more than the
+tolerance, so that it can gate a change.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+
+import numpy as np
+
+SOURCE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SOURCE)
+
+import classes.logic as logic
+from classes.game import Game
+from classes.strategy import MiniMax, ABheur
+
+
+def position(board_size: int, seed: int, fill: float = 0.4) -> np.ndarray:
+    """
+    @return   A board with about fill of its cells played alternately
+              at random, black first, and no winner yet. The same
+              seed gives the same position.
+    """
+    rng = np.random.default_rng(seed * 100 + board_size)
+    board = np.zeros((board_size, board_size), dtype=np.int8)
+    connectivity = logic.Connectivity(board_size, undoable=True)
+    cells = rng.permutation(board_size * board_size)
+    player = logic.BLACK_PLAYER
+    for index in cells[:int(fill * board_size * board_size)]:
+        node = divmod(int(index), board_size)
+        connectivity.place(node, player)
+        if connectivity.winner(player) is not None:
+            # Skip the moves that would end the game
+            connectivity.undo()
+            continue
+        board[node] = player
+        player = 3 - player
+    return board
+
+
+def rate(func, operations: int, min_time: float, repeat: int) -> float:
+    """
+    Calls func until min_time seconds have passed, repeat times.
+
+    @return   The best number of operations per second, given that a
+              call of func does operations operations.
+    """
+    best = 0.
+    for _ in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            func()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, calls * operations / elapsed)
+    return best
+
+
+def search_rate(strategy, board: np.ndarray, max_nodes: int,
+                repeat: int) -> float:
+    """
+    @return   The best nodes per second of a search of max_nodes nodes
+              by strategy (a MiniMax subclass) from board. A new player
+              is built for each search, with an empty transposition
+              table.
+    """
+    player = (logic.BLACK_PLAYER if np.count_nonzero(board) % 2 == 0
+              else logic.WHITE_PLAYER)
+    best = 0.
+    for _ in range(repeat):
+        searcher = strategy(board, player, max_nodes=max_nodes)
+        start = time.perf_counter()
+        searcher.start()
+        elapsed = time.perf_counter() - start
+        best = max(best, searcher.stats.nodes / elapsed)
+    return best
+
+
+def random_game(board_size: int, seed: int) -> None:
+    game = Game(board_size=board_size, strat=("random", "random"),
+                use_ui=False, options={"seed": seed})
+    while game.winner is None:
+        game.play()
+
+
+def run(sizes: list, seed: int, min_time: float, repeat: int,
+        max_nodes: int) -> dict:
+    """
+    @return   {benchmark name: {"value": rate, "unit": unit}}, the
+              names being suffixed with the board size.
+    """
+    results = {}
+
+    def report(name, size, value, unit):
+        key = f"{name}[{size}]"
+        results[key] = {"value": value, "unit": unit}
+        print(f"{key:24} {value:14.1f} {unit}", flush=True)
+
+    for size in sizes:
+        board = position(size, seed)
+        cells = [(x, y) for x in range(size) for y in range(size)]
+
+        def neighbours():
+            for cell in cells:
+                logic.get_neighbours(cell, size)
+
+        report("get_neighbours", size,
+               rate(neighbours, len(cells), min_time, repeat), "calls/s")
+        report("get_possible_moves", size,
+               rate(lambda: logic.get_possible_moves(board), 1, min_time,
+                    repeat), "calls/s")
+        report("is_game_over", size,
+               rate(lambda: logic.is_game_over(logic.BLACK_PLAYER, board),
+                    1, min_time, repeat), "calls/s")
+        report("random_game", size,
+               rate(lambda: random_game(size, seed), 1, min_time, repeat),
+               "games/s")
+        report("minimax", size,
+               search_rate(MiniMax, board, max_nodes, repeat), "nodes/s")
+        report("abheur", size,
+               search_rate(ABheur, board, max_nodes, repeat), "nodes/s")
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Prints the change of each rate from the baseline.
+
+    @return   The names of the benchmarks whose rate dropped by more
+              than tolerance (a fraction of the baseline).
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["value"]
+        change = result["value"] / before - 1 if before else 0.
+        flag = ""
+        if change < -tolerance:
+            regressions.append(name)
+            flag = "REGRESSION"
+        print(f"{name:24} {before:14.1f} -> {result['value']:14.1f}"
+              f" {change * 100:+7.1f}% {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--sizes', default=list(range(3, 14, 2)), type=int,
+                        nargs='+',
+                        help='Board sizes (default: 3 5 7 9 11 13)')
+    parser.add_argument('--seed', default=0, type=int,
+                        help='Seed of the positions and games (default: 0)')
+    parser.add_argument('--min-time', default=0.2, type=float,
+                        help='Minimum time of a measure, in seconds'
+                             ' (default: 0.2)')
+    parser.add_argument('--repeat', default=3, type=int,
+                        help='Measures per benchmark, the best one is'
+                             ' kept (default: 3)')
+    parser.add_argument('--max-nodes', default=2000, type=int,
+                        help='Node budget of the searches (default: 2000)')
+    parser.add_argument('--json', default=None,
+                        help='Write the results to this file')
+    parser.add_argument('--baseline', default=None,
+                        help='Compare the results to this file')
+    parser.add_argument('--tolerance', default=0.1, type=float,
+                        help='Slowdown above which a rate is a regression,'
+                             ' as a fraction (default: 0.1)')
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.seed, args.min_time, args.repeat,
+                  args.max_nodes)
+
+    if args.json is not None:
+        with open(args.json, "w") as file:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "settings": {
+                    "seed": args.seed, "min_time": args.min_time,
+                    "repeat": args.repeat, "max_nodes": args.max_nodes,
+                },
+                "results": results,
+            }, file, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        print()
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): "
+                  + ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Startup time of the program, for short batch jobs and spawned workers.
+
+Each command is run in a fresh interpreter, several times, and the
+median wall time is reported. Run from the `source` directory:
+
+    $ python benchmarks/startup.py --repeat 10
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+SOURCE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = {
+    "python": ["-c", "pass"],
+    "import logic": ["-c", "import classes.logic"],
+    "import strategy": ["-c", "import classes.strategy"],
+    "import tournament": ["-c", "import classes.tournament"],
+    "headless game": [
+        "main.py", "--no-ui", "--games", "1", "--size", "3",
+        "--player", "random", "--other", "random"
+    ],
+}
+
+
+def measure(command: list, repeat: int) -> list:
+    """
+    @return   The wall times of repeat runs of command, in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable] + command, cwd=SOURCE, check=True,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def heavy_modules(command: list) -> list:
+    """
+    @return   The names of the UI and table libraries that command
+              imports.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime"] + command, cwd=SOURCE,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    modules = {
+        line.split("|")[-1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+    return sorted(
+        name for name in ("pygame", "pandas", "rich.table", "rich.logging")
+        if name in modules
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--repeat', default=5, type=int,
+                        help='Runs per command (default: 5)')
+    parser.add_argument('--json', default=None,
+                        help='Also write the results to this file')
+    args = parser.parse_args()
+
+    results = {}
+    for name, command in COMMANDS.items():
+        times = measure(command, args.repeat)
+        results[name] = {
+            "median_s": statistics.median(times),
+            "min_s": min(times),
+            "heavy_modules": heavy_modules(command),
+        }
+        print(f"{name:20} {results[name]['median_s'] * 1000:8.1f} ms"
+              f"  {' '.join(results[name]['heavy_modules'])}")
+
+    if args.json is not None:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import argparse
+import multiprocessing
+from collections import defaultdict
+
+import numpy as np
+
+import classes.logic as logic
+from classes.board import BitBoard
+from classes.book import OpeningBook, canonical, play_sequence
+from classes.results import read_records
+from classes.solver import ProofNumberSolver
+from classes.strategy import make_player, str2strat
+from classes.symmetry import get_symmetry
+
+
+def arguments():
+    parser = argparse.ArgumentParser(
+        description='Builds an opening book (cf. the --book option of'
+                    ' main.py), by searching the first moves of the games'
+                    ' or from the results of tournaments.'
+    )
+    parser.add_argument('book', help='Book file, created or updated')
+    subparsers = parser.add_subparsers(dest='source', required=True)
+
+    search = subparsers.add_parser(
+        'search', help='Search every position of the first plies'
+    )
+    search.add_argument('--size', default=7, type=int,
+                        help='Size of the board (default: 7)')
+    search.add_argument('--plies', default=2, type=int,
+                        help='Moves played before the positions searched'
+                             ' (default: 2, i.e. up to 2)')
+    search.add_argument('--strategy', default='abheur',
+                        choices=[s for s in str2strat if s != 'human'],
+                        help='Strategy choosing the moves (default: abheur)')
+    search.add_argument('--move-time', default=None, type=float,
+                        help='Time budget per position, in seconds')
+    search.add_argument('--max-nodes', default=None, type=int,
+                        help='Node budget per position')
+    search.add_argument('--solver-nodes', default=20_000, type=int,
+                        help='Node budget of the proof-number solver,'
+                             ' which scores the positions (default: 20000)')
+    search.add_argument('--jobs', default=1, type=int,
+                        help='Positions searched in parallel (default: 1)')
+
+    results = subparsers.add_parser(
+        'results', help='Play the moves that won the most games'
+    )
+    results.add_argument('results', nargs='+',
+                         help='Results files, CSV (.csv) or JSON lines')
+    results.add_argument('--plies', default=8, type=int,
+                         help='Moves of each game looked at (default: 8)')
+    results.add_argument('--min-games', default=10, type=int,
+                         help='Games a move must have been played in'
+                              ' (default: 10)')
+    return parser.parse_args()
+
+
+def positions(board_size: int, plies: int) -> list:
+    """
+    @return   The (board, player to move) reached after at most plies
+              moves, either player starting, one per canonical position.
+    """
+    found = []
+    seen = set()
+    for starter in (logic.BLACK_PLAYER, logic.WHITE_PLAYER):
+        layer = [np.zeros((board_size, board_size), dtype=np.int8)]
+        player = starter
+        for ply in range(plies + 1):
+            next_layer = []
+            for board in layer:
+                key, _ = canonical(board, player)
+                if key in seen:
+                    continue
+                seen.add(key)
+                found.append((board, player))
+                if ply < plies:
+                    for move in logic.get_possible_moves(board):
+                        child = board.copy()
+                        child[move] = player
+                        next_layer.append(child)
+            layer = next_layer
+            player = 3 - player
+    return found
+
+
+def search_entry(args) -> tuple:
+    """
+    @return   (board, player, move, score) of a position: a winning
+              move if the solver finds one (score 1), else the move of
+              the strategy, scored 0 if the solver proved the position
+              lost and 0.5 if it is unknown.
+    """
+    board, player, strategy_name, options, solver_nodes = args
+    winner, move = ProofNumberSolver(solver_nodes).solve(
+        BitBoard.from_array(board), player)
+    if move is not None:
+        return board, player, move, 1.
+    strategy = make_player(strategy_name, board, player, options)
+    move = strategy.start()
+    return board, player, tuple(map(int, move)), 0. if winner else .5
+
+
+def from_search(book: OpeningBook, args) -> int:
+    options = {"move_time": args.move_time, "max_nodes": args.max_nodes}
+    tasks = [
+        (board, player, args.strategy, options, args.solver_nodes)
+        for (board, player) in positions(args.size, args.plies)
+    ]
+    if args.jobs > 1:
+        with multiprocessing.Pool(args.jobs) as pool:
+            entries = pool.imap_unordered(search_entry, tasks)
+            for (board, player, move, score) in entries:
+                book.add(board, player, move, score)
+    else:
+        for task in tasks:
+            book.add(*search_entry(task))
+    return len(tasks)
+
+
+def from_results(book: OpeningBook, args) -> int:
+    # (board size, canonical key) -> canonical move -> [games, wins],
+    # with a board of the position to store it
+    counts = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    boards = {}
+    for path in args.results:
+        for record in read_records(path):
+            sequence = record.get("sequence")
+            if not sequence:
+                continue
+            n = record["board_size"]
+            replay = play_sequence(n, record["starter"],
+                                   sequence[:args.plies])
+            for (board, player, (x, y)) in replay:
+                key, transform = canonical(board, player)
+                position = (n, key)
+                boards.setdefault(position, (board.copy(), player, transform))
+                count = counts[position][
+                    get_symmetry(n).cell(x * n + y, transform)]
+                count[0] += 1
+                count[1] += record["winner"] == player
+
+    added = 0
+    for position, moves in counts.items():
+        n, _ = position
+        board, player, transform = boards[position]
+        # Best winrate, then most games
+        played = [(wins / games, games, index)
+                  for index, (games, wins) in moves.items()
+                  if games >= args.min_games]
+        if not played:
+            continue
+        score, games, index = max(played)
+        move = divmod(get_symmetry(n).cell(index, transform), n)
+        book.add(board, player, move, score, games)
+        added += 1
+    return added
+
+
+if __name__ == "__main__":
+    args = arguments()
+    book = OpeningBook(args.book, writable=True)
+    if args.source == 'search':
+        added = from_search(book, args)
+    else:
+        added = from_results(book, args)
+    book.commit()
+    print(f"{added} positions added, {len(book)} in the book")
+    book.close()
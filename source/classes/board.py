@@ -0,0 +1,359 @@
+import random
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+import classes.logic as logic
+
+# Board representations used by the search algorithms. They all share
+# the same interface (see `HexBoard`) and are selected by name through
+# the `backends` dictionary at the end of the file.
+
+
+@lru_cache(maxsize=None)
+def get_zobrist(board_size: int) -> dict:
+    """
+    @return   The Zobrist keys of a board of the given size: one random
+              64 bits key per (player, cell) and one per player to
+              move. They are seeded by the board size so that keys are
+              the same in every process.
+    """
+    rng = random.Random(board_size)
+    n_cells = board_size * board_size
+    return {
+        logic.BLACK_PLAYER: [rng.getrandbits(64) for _ in range(n_cells)],
+        logic.WHITE_PLAYER: [rng.getrandbits(64) for _ in range(n_cells)],
+        "to_move": {
+            logic.BLACK_PLAYER: rng.getrandbits(64),
+            logic.WHITE_PLAYER: rng.getrandbits(64)
+        }
+    }
+
+
+class HexBoard:
+    """
+    A mutable Hex position supporting make/unmake of moves.
+
+    Moves are (x, y) tuples, as everywhere else in the program.
+    `key` is the Zobrist hash of the stones, maintained by `play` and
+    `undo`.
+    """
+    def __init__(self, board_size: int):
+        self.board_size = board_size
+        self.zobrist = get_zobrist(board_size)
+        self.key = 0
+
+    def hash(self, to_move: int) -> int:
+        """
+        @return   The Zobrist hash of the position with to_move being
+                  the player to move.
+        """
+        return self.key ^ self.zobrist["to_move"][to_move]
+
+    @classmethod
+    def from_array(cls, board: np.ndarray):
+        """
+        @return   A new board holding the stones of board (the
+                  `Game.logger` representation).
+        """
+        instance = cls(board.shape[0])
+        for player in (logic.BLACK_PLAYER, logic.WHITE_PLAYER):
+            for node in logic.get_player_tiles(board, player):
+                instance.play(node, player)
+        return instance
+
+    def to_array(self) -> np.ndarray:
+        """
+        @return   The `Game.logger` representation of the board.
+        """
+        raise NotImplementedError
+
+    def moves(self) -> list:
+        """
+        @return   All the coordinates of nodes where it is possible to
+                  play.
+        """
+        raise NotImplementedError
+
+    def cells(self) -> list:
+        """
+        @return   The player on each cell (0 if empty), by flat index
+                  x * board_size + y. This is a copy.
+        """
+        return self.to_array().reshape(-1).tolist()
+
+    def play(self, move: tuple, player: int) -> None:
+        """
+        Places a stone of player on move.
+        """
+        raise NotImplementedError
+
+    def undo(self) -> None:
+        """
+        Removes the last stone placed by `play`.
+        """
+        raise NotImplementedError
+
+    def winner(self, player: Optional[int] = None) -> Optional[int]:
+        """
+        @return   The winning player, or None. If player is given,
+                  only this player is checked.
+        """
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """
+        @return   The number of stones on the board.
+        """
+        raise NotImplementedError
+
+    def recent(self, k: int) -> list:
+        """
+        @return   The flat indices of the last k stones played, the
+                  last one first.
+        """
+        raise NotImplementedError
+
+    def playout(self, to_move: int, rng) -> int:
+        """
+        Fills the empty cells at random, starting with to_move, and
+        takes the stones back.
+
+        @return   The winner of the filled board. Hex has no draw so
+                  the winner of a full board is checked once.
+        """
+        moves = self.moves()
+        rng.shuffle(moves)
+        player = to_move
+        for move in moves:
+            self.play(move, player)
+            player = 3 - player
+        winner = self.winner(logic.BLACK_PLAYER) or logic.WHITE_PLAYER
+        for _ in moves:
+            self.undo()
+        return winner
+
+    def copy(self):
+        return self.from_array(self.to_array())
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+
+class ArrayBoard(HexBoard):
+    """
+    The `Game.logger` 2D array, plus an undoable `logic.Connectivity`
+    for win detection.
+    """
+    def __init__(self, board_size: int):
+        super().__init__(board_size)
+        self.state = np.zeros(
+            shape=(board_size, board_size),
+            dtype=np.int8
+        )
+        self.connectivity = logic.Connectivity(board_size, undoable=True)
+        self.history = []
+
+    def to_array(self) -> np.ndarray:
+        return self.state.copy()
+
+    def moves(self) -> list:
+        return logic.get_possible_moves(self.state)
+
+    def cells(self) -> list:
+        return list(self.connectivity.cells)
+
+    def play(self, move: tuple, player: int) -> None:
+        (x, y) = move
+        self.state[x][y] = player
+        self.connectivity.place(move, player)
+        self.key ^= self.zobrist[player][x * self.board_size + y]
+        self.history.append(move)
+
+    def undo(self) -> None:
+        (x, y) = self.history.pop()
+        player = int(self.state[x][y])
+        self.key ^= self.zobrist[player][x * self.board_size + y]
+        self.state[x][y] = 0
+        self.connectivity.undo()
+
+    def recent(self, k: int) -> list:
+        n = self.board_size
+        return [x * n + y for (x, y) in self.history[:-k - 1:-1]]
+
+    def winner(self, player: Optional[int] = None) -> Optional[int]:
+        return self.connectivity.winner(player)
+
+    def count(self) -> int:
+        return len(self.history)
+
+
+@lru_cache(maxsize=None)
+def get_masks(board_size: int) -> dict:
+    """
+    @return   The bit masks of a board of the given size: every cell,
+              the first and last column and row, and the neighbours
+              of each cell. Cell (x, y) is bit x * board_size + y.
+    """
+    n = board_size
+    topology = logic.get_topology(board_size)
+
+    def to_bits(indices):
+        return sum(1 << int(index) for index in indices)
+
+    full = (1 << (n * n)) - 1
+    (first_column, last_column), (first_row, last_row) = (
+        (to_bits(np.flatnonzero(start)), to_bits(np.flatnonzero(end)))
+        for (start, end) in (topology.borders[logic.BLACK_PLAYER],
+                             topology.borders[logic.WHITE_PLAYER])
+    )
+    neighbours = [to_bits(indices) for indices in topology.adjacency]
+    return {
+        "full": full,
+        "not_first_column": full & ~first_column,
+        "not_last_column": full & ~last_column,
+        "neighbours": neighbours,
+        # (start, end) borders of each player
+        logic.BLACK_PLAYER: (first_column, last_column),
+        logic.WHITE_PLAYER: (first_row, last_row),
+    }
+
+
+class BitBoard(HexBoard):
+    """
+    One Python integer per player, used as a set of bits. Move
+    generation, placement and win detection are bit operations.
+    """
+    def __init__(self, board_size: int):
+        super().__init__(board_size)
+        self.masks = get_masks(board_size)
+        # Indexed by player, index 0 is unused
+        self.bits = [0, 0, 0]
+        self.history = []
+
+    def copy(self):
+        other = BitBoard(self.board_size)
+        other.bits = list(self.bits)
+        other.history = list(self.history)
+        other.key = self.key
+        return other
+
+    def to_array(self) -> np.ndarray:
+        n = self.board_size
+        board = np.zeros(n * n, dtype=np.int8)
+        for player in (logic.BLACK_PLAYER, logic.WHITE_PLAYER):
+            board[self.indices(self.bits[player])] = player
+        return board.reshape((n, n))
+
+    @staticmethod
+    def indices(bits: int) -> list:
+        """
+        @return   The indices of the set bits, in increasing order.
+        """
+        indices = []
+        while bits:
+            low = bits & -bits
+            indices.append(low.bit_length() - 1)
+            bits ^= low
+        return indices
+
+    def empty(self) -> int:
+        """
+        @return   The set of empty cells.
+        """
+        return self.masks["full"] & ~(self.bits[1] | self.bits[2])
+
+    def moves(self) -> list:
+        n = self.board_size
+        return [divmod(i, n) for i in self.indices(self.empty())]
+
+    def cells(self) -> list:
+        cells = [0] * (self.board_size * self.board_size)
+        for player in (logic.BLACK_PLAYER, logic.WHITE_PLAYER):
+            for index in self.indices(self.bits[player]):
+                cells[index] = player
+        return cells
+
+    def play(self, move: tuple, player: int) -> None:
+        (x, y) = move
+        # Cast numpy integers, which would overflow past 64 cells
+        index = int(x * self.board_size + y)
+        bit = 1 << index
+        self.bits[player] |= bit
+        self.key ^= self.zobrist[player][index]
+        self.history.append((player, index))
+
+    def undo(self) -> None:
+        player, index = self.history.pop()
+        self.bits[player] ^= 1 << index
+        self.key ^= self.zobrist[player][index]
+
+    def recent(self, k: int) -> list:
+        return [index for (_, index) in self.history[:-k - 1:-1]]
+
+    def dilate(self, bits: int) -> int:
+        """
+        @return   bits and all their neighbours.
+        """
+        n = self.board_size
+        masks = self.masks
+        return (
+            bits
+            | bits >> n
+            | (bits << n) & masks["full"]
+            | (bits << 1 | bits >> (n - 1)) & masks["not_first_column"]
+            | (bits >> 1 | bits << (n - 1)) & masks["not_last_column"]
+        )
+
+    def is_connected(self, player: int) -> bool:
+        """
+        @return   True iff player connects its two borders, by flood
+                  filling its stones from its first border.
+        """
+        return self.connects(self.bits[player], player)
+
+    def winner(self, player: Optional[int] = None) -> Optional[int]:
+        players = (logic.BLACK_PLAYER, logic.WHITE_PLAYER) if player is None else (player,)
+        for p in players:
+            if self.is_connected(p):
+                return p
+        return None
+
+    def count(self) -> int:
+        return len(self.history)
+
+    def playout(self, to_move: int, rng) -> int:
+        empty = self.indices(self.empty())
+        rng.shuffle(empty)
+        # to_move gets the first half (rounded up) of the shuffled cells
+        half = (len(empty) + 1) // 2
+        filled = self.bits[to_move]
+        for index in empty[:half]:
+            filled |= 1 << index
+        if to_move == logic.BLACK_PLAYER:
+            black = filled
+        else:
+            black = self.masks["full"] & ~filled
+        return logic.BLACK_PLAYER if self.connects(black, logic.BLACK_PLAYER) else logic.WHITE_PLAYER
+
+    def connects(self, own: int, player: int) -> bool:
+        """
+        @return   True iff the stones own connect the borders of player.
+        """
+        start, end = self.masks[player]
+        reached = own & start
+        while reached:
+            if reached & end:
+                return True
+            grown = self.dilate(reached) & own
+            if grown == reached:
+                return False
+            reached = grown
+        return False
+
+
+backends: dict[str, HexBoard] = {
+        "array": ArrayBoard,
+        "bitboard": BitBoard,
+}
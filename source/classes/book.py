@@ -0,0 +1,135 @@
+import os
+import sqlite3
+from typing import Optional
+
+import numpy as np
+
+import classes.logic as logic
+from classes.symmetry import get_symmetry
+
+# Opening book: the move to play in known positions, built offline
+# (cf. build_book.py) and looked up by the players before they search.
+#
+# Positions are stored once for all their symmetries (cf. symmetry.py):
+# the book is keyed by the canonical hash of the position, with the
+# player to move, and its moves are those of the canonical position.
+#
+# The book is an SQLite file: lookups are primary key searches, and
+# any number of processes can read it at once.
+
+# SQLite integers are signed 64 bits
+SIGN_BIT = 1 << 63
+
+
+def _signed(key: int) -> int:
+    return key - (1 << 64) if key >= SIGN_BIT else key
+
+
+def canonical(board_state: np.ndarray, to_move: int) -> tuple:
+    """
+    @return   (key, transform): the canonical hash of the position (the
+              `Game.logger` representation) with to_move to play, and
+              the symmetry mapping it to the canonical position.
+    """
+    symmetry = get_symmetry(board_state.shape[0])
+    keys = symmetry.keys(board_state.reshape(-1).tolist())
+    return symmetry.canonical(keys, to_move)
+
+
+class OpeningBook:
+    """
+    An opening book file. Each entry holds, for a board size and a
+    canonical position, the move to play, its score for the player to
+    move (a winrate, or 1 / 0 for solved positions) and the number of
+    games or searches behind it.
+
+    Books opened read only (the default) never lock the file, so that
+    worker processes can share it. The connection is made on the first
+    lookup of each process: connections are not carried over fork.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS book (
+            board_size INTEGER NOT NULL,
+            key INTEGER NOT NULL,
+            move INTEGER NOT NULL,
+            score REAL NOT NULL,
+            visits INTEGER NOT NULL,
+            PRIMARY KEY (board_size, key)
+        ) WITHOUT ROWID
+    """
+
+    def __init__(self, path: str, writable: bool = False):
+        self.path = path
+        self.writable = writable
+        self.connection = None
+        self.pid = None
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None or self.pid != os.getpid():
+            if self.writable:
+                self.connection = sqlite3.connect(self.path)
+                self.connection.execute(self.SCHEMA)
+            else:
+                self.connection = sqlite3.connect(
+                    f"file:{self.path}?mode=ro", uri=True,
+                    check_same_thread=False
+                )
+            self.pid = os.getpid()
+        return self.connection
+
+    def close(self) -> None:
+        if self.connection is not None and self.pid == os.getpid():
+            self.connection.close()
+        self.connection = None
+
+    def __len__(self) -> int:
+        return self.connect().execute("SELECT COUNT(*) FROM book").fetchone()[0]
+
+    def lookup(self, board_state: np.ndarray, to_move: int) -> Optional[tuple]:
+        """
+        @return   (move, score, visits) of the position, the move being
+                  an (x, y) tuple, or None if it is not in the book.
+        """
+        n = board_state.shape[0]
+        key, transform = canonical(board_state, to_move)
+        row = self.connect().execute(
+            "SELECT move, score, visits FROM book"
+            " WHERE board_size = ? AND key = ?", (n, _signed(key))
+        ).fetchone()
+        if row is None:
+            return None
+        move, score, visits = row
+        return get_symmetry(n).move(divmod(move, n), transform), score, visits
+
+    def add(self, board_state: np.ndarray, to_move: int, move: tuple,
+            score: float, visits: int = 1) -> None:
+        """
+        Stores the move to play in the position, replacing the entry
+        of the position if any. The changes are saved by `commit`.
+        """
+        n = board_state.shape[0]
+        key, transform = canonical(board_state, to_move)
+        x, y = get_symmetry(n).move(move, transform)
+        self.connect().execute(
+            "INSERT OR REPLACE INTO book VALUES (?, ?, ?, ?, ?)",
+            (n, _signed(key), x * n + y, float(score), int(visits))
+        )
+
+    def commit(self) -> None:
+        self.connect().commit()
+
+
+def play_sequence(board_size: int, starter: int, sequence: list):
+    """
+    Replays a game given as the flat indices of its moves.
+
+    @return   An iterator over the (board, player to move, move) before
+              each move, the board being updated in place.
+    """
+    board = np.zeros((board_size, board_size), dtype=np.int8)
+    player = starter
+    for index in sequence:
+        move = divmod(int(index), board_size)
+        yield board, player, move
+        board[move] = player
+        player = logic.BLACK_PLAYER + logic.WHITE_PLAYER - player
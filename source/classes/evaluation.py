@@ -0,0 +1,222 @@
+from collections import deque
+
+import numpy as np
+
+import classes.logic as logic
+
+# Static evaluation of Hex positions, used at the leaves of the
+# alpha-beta search (see ABheur). Positions are read through
+# `HexBoard.cells`, never modified, and evaluated once: the results are
+# cached by Zobrist key.
+
+# Distance of a player that cannot connect anymore
+BLOCKED = 10 ** 6
+
+
+def distance(cells: list, player: int, topology: logic.Topology) -> int:
+    """
+    @return   The number of stones player still needs to connect its
+              borders, given the flat cells of the board: the length
+              of the shortest path between the borders where the
+              player's stones cost 0, empty cells cost 1 and the
+              opponent's stones are walls (0-1 BFS). BLOCKED if there
+              is no such path.
+    """
+    opponent = 3 - player
+    dist = [BLOCKED] * topology.n_cells
+    queue = deque()
+    for index, start in enumerate(topology.is_start[player]):
+        if start and cells[index] != opponent:
+            dist[index] = 0 if cells[index] == player else 1
+            if dist[index]:
+                queue.append(index)
+            else:
+                queue.appendleft(index)
+
+    is_end = topology.is_end[player]
+    adjacency = topology.adjacency
+    while queue:
+        index = queue.popleft()
+        d = dist[index]
+        if is_end[index]:
+            # Cells leave the queue in order of distance
+            return d
+        for neighbour in adjacency[index]:
+            cell = cells[neighbour]
+            if cell == opponent:
+                continue
+            if cell == player:
+                if d < dist[neighbour]:
+                    dist[neighbour] = d
+                    queue.appendleft(neighbour)
+            elif d + 1 < dist[neighbour]:
+                dist[neighbour] = d + 1
+                queue.append(neighbour)
+    return BLOCKED
+
+
+def distance_map(cells: list, player: int, topology: logic.Topology,
+                 from_end: bool = False) -> list:
+    """
+    @return   For each cell, the number of stones player needs to
+              connect it to its first border (its last one if
+              from_end), the cell included. BLOCKED for the opponent's
+              stones and the cells cut from the border.
+    """
+    opponent = 3 - player
+    dist = [BLOCKED] * topology.n_cells
+    queue = deque()
+    border = (topology.is_end if from_end else topology.is_start)[player]
+    for index, on_border in enumerate(border):
+        if on_border and cells[index] != opponent:
+            dist[index] = 0 if cells[index] == player else 1
+            if dist[index]:
+                queue.append(index)
+            else:
+                queue.appendleft(index)
+
+    adjacency = topology.adjacency
+    while queue:
+        index = queue.popleft()
+        d = dist[index]
+        for neighbour in adjacency[index]:
+            cell = cells[neighbour]
+            if cell == opponent:
+                continue
+            cost = 0 if cell == player else 1
+            if d + cost < dist[neighbour]:
+                dist[neighbour] = d + cost
+                if cost:
+                    queue.append(neighbour)
+                else:
+                    queue.appendleft(neighbour)
+    return dist
+
+
+def winning_cells(cells: list, player: int, topology: logic.Topology) -> list:
+    """
+    @return   The empty cells where a stone of player connects its
+              borders.
+    """
+    start = distance_map(cells, player, topology)
+    end = distance_map(cells, player, topology, from_end=True)
+    return [
+        index for index in range(topology.n_cells)
+        if start[index] == 1 and end[index] == 1 and cells[index] == 0
+    ]
+
+
+def resistance(cells: list, player: int, topology: logic.Topology) -> float:
+    """
+    @return   The electrical resistance between the borders of player,
+              the board being a circuit where the player's stones are
+              (nearly) perfect conductors, empty cells are resistors of
+              1 ohm and the opponent's stones are insulators. Unlike
+              distance, it counts the number of ways to connect.
+    """
+    n_cells = topology.n_cells
+    cells = np.asarray(cells)
+    r = np.where(cells == player, 1e-3, 1.)
+    open_cells = cells != 3 - player
+
+    # Conductance between adjacent cells (the padding sentinel of
+    # topology.neighbours is an insulator)
+    r_padded = np.append(r, np.inf)
+    open_padded = np.append(open_cells, False)
+    neighbours = topology.neighbours
+    conductance = np.where(
+        open_cells[:, None] & open_padded[neighbours],
+        1. / (r[:, None] + r_padded[neighbours]), 0.
+    )
+
+    # Laplacian over the cells plus the source (start border) node,
+    # the sink (end border) being the ground. A small leak to the
+    # ground keeps the cells cut from the borders solvable.
+    source = n_cells
+    laplacian = np.zeros((n_cells + 1, n_cells + 1))
+    rows = np.repeat(np.arange(n_cells), 6)
+    columns = neighbours.reshape(-1)
+    inside = columns < n_cells
+    np.add.at(laplacian, (rows[inside], columns[inside]),
+              -conductance.reshape(-1)[inside])
+    degree = conductance.sum(axis=1)
+
+    start, end = topology.borders[player]
+    to_source = np.where(start & open_cells, 1. / r, 0.)
+    to_sink = np.where(end & open_cells, 1. / r, 0.)
+    laplacian[np.arange(n_cells), np.arange(n_cells)] = degree + to_source + to_sink + 1e-9
+    laplacian[source, :n_cells] = -to_source
+    laplacian[:n_cells, source] = -to_source
+    laplacian[source, source] = to_source.sum() + 1e-9
+
+    # Potential of the source for a unit current
+    current = np.zeros(n_cells + 1)
+    current[source] = 1.
+    return float(np.linalg.solve(laplacian, current)[source])
+
+
+methods = {
+    "distance": distance,
+    "resistance": resistance,
+}
+
+
+class Evaluator:
+    """
+    Scores positions with one of the `methods`, for both players at
+    once, and caches the results by Zobrist key of the stones (the
+    score does not depend on the player to move).
+
+    The score of a player is the difference between the opponent's
+    measure and its own (in stones for distance, in orders of
+    magnitude of resistance for resistance), clipped to limit.
+
+    Given the symmetric keys of the position (cf. symmetry.py), the
+    symmetric positions share their cache entry: the measures of a
+    position whose colours are swapped are swapped too.
+    """
+    def __init__(self, board_size: int, method: str = "distance",
+                 cache_size: int = 2 ** 16, limit: float = 99.):
+        self.topology = logic.get_topology(board_size)
+        self.method = methods[method]
+        self.log = method == "resistance"
+        self.cache_size = cache_size
+        self.limit = limit
+        self.cache = {}
+
+    def measures(self, board, symmetric_keys=None) -> tuple:
+        """
+        @return   The measure of (black, white) on board, a HexBoard,
+                  whose symmetric keys may be given.
+        """
+        if symmetric_keys is None:
+            key, swap = board.key, False
+        else:
+            key, transform = symmetric_keys.canonical()
+            swap = symmetric_keys.symmetry.swaps[transform]
+        measures = self.cache.get(key)
+        if measures is None:
+            cells = board.cells()
+            measures = (
+                self.method(cells, logic.BLACK_PLAYER, self.topology),
+                self.method(cells, logic.WHITE_PLAYER, self.topology),
+            )
+            if self.log:
+                measures = tuple(np.log10(m) for m in measures)
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            self.cache[key] = measures[::-1] if swap else measures
+        elif swap:
+            measures = measures[::-1]
+        return measures
+
+    def score(self, board, player: int, symmetric_keys=None,
+              to_move=None) -> float:
+        """
+        @return   The score of board for player, positive when player
+                  is ahead. It does not depend on the player to move,
+                  to_move (cf. network.NetworkEvaluator).
+        """
+        black, white = self.measures(board, symmetric_keys)
+        score = white - black if player == logic.BLACK_PLAYER else black - white
+        return float(min(self.limit, max(-self.limit, score)))
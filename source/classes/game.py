@@ -1,24 +1,31 @@
 import sys
+import time
 from typing import Tuple, Optional
 
-import pygame
 import numpy as np
-from rich.table import Table
-from rich.console import Console
 
-from classes.ui import UI, NoUI
+from classes.noui import NoUI
 import classes.logic as logic
-from classes.strategy import str2strat
+from classes.results import make_record
+from classes.strategy import make_player
 
 
 class Game:
     def __init__(self, board_size: int, strat: str,
-                 black_starts: bool = True, use_ui=True):
+                 black_starts: bool = True, use_ui=True,
+                 options: Optional[dict] = None,
+                 players: Optional[dict] = None,
+                 instruments: Optional[list] = None,
+                 game_id: int = 0):
         """
         Initialisation of a new game with:
             * the size of the board,
             * the players strategies, eg., ("human", "random"),
-            * which player starts, i.e., black (by default) or white.
+            * which player starts, i.e., black (by default) or white,
+            * the options given to the AI strategies (cf. strategy.py),
+            * the AI players kept from a previous game, if any,
+            * the instruments observing the game (cf. stats.py) and
+              the number of the game they report.
 
         Besides, the user interface is initialised and displayed.
 
@@ -33,6 +40,7 @@ class Game:
         """
 
         self.strat = strat
+        self.options = options or {}
 
         # Initialize info about player and turns
         # Does BLACK player start?
@@ -50,6 +58,8 @@ class Game:
         # Instantiate classes
         self.use_ui = use_ui
         if self.use_ui:
+            # pygame is only loaded when the game is displayed
+            from classes.ui import UI
             self.ui = UI(board_size)
         else:
             self.ui = NoUI(board_size)
@@ -63,6 +73,26 @@ class Game:
             shape=(self.board_size, self.board_size),
             dtype=np.int8
         )
+        # Incremental win detection, updated on every placed tile
+        self.connectivity = logic.Connectivity(self.board_size)
+
+        # (player, think time, search counters) of each move
+        self.moves = []
+        # Cells played, as flat indices
+        self.sequence = []
+        self.think_time, self.move_stats = None, {}
+
+        # AI players, created on their first turn. When they are
+        # given, they are kept from one game to the next, and reset
+        # for this new one.
+        self.players = players if players is not None else {}
+        for strategy in self.players.values():
+            strategy.reset(self.logger)
+
+        self.game_id = game_id
+        self.instruments = instruments or []
+        for instrument in self.instruments:
+            instrument.on_game_start(self)
 
     def print_game_info(self, args) -> None:
         """
@@ -74,6 +104,9 @@ class Game:
         if not self.use_ui:
             return
 
+        from rich.table import Table
+        from rich.console import Console
+
         console = Console()
 
         table = Table(
@@ -116,6 +149,7 @@ class Game:
 
         if strategy_name == "human":
             # human player's turn
+            self.think_time, self.move_stats = None, {}
             node = self.human_turn()
             if node is None:
                 # Player did not click yet, no turn to play
@@ -126,16 +160,36 @@ class Game:
             node = self.ai_turn(player, strategy_name)
             assert logic.is_node_free(node, self.logger), "AI returned a busy node"
 
-        # Place the tile on the node
+        self.place(node, player)
+
+    def place(self, node, player) -> None:
+        """
+        Places a tile of player, whose turn it is, on node: updates the
+        board, the players and the instruments, checks for a winner and
+        initialises the next turn. The move is recorded with the think
+        time and search counters of the last turn, to be set to None
+        and {} for moves that no player chose (e.g. random openings).
+        """
         self.ui.update_tile_color(node, player)
         x, y = node
         self.logger[x][y] = player
+        self.connectivity.place(node, player)
+        for strategy in self.players.values():
+            strategy.notify_move(node, player)
+        self.moves.append((player, self.think_time, self.move_stats))
+        self.sequence.append(int(x) * self.board_size + int(y))
+        for instrument in self.instruments:
+            instrument.on_move(self, player, node, self.think_time,
+                               self.move_stats)
 
         # Next turn
         self.turn_state = not self.turn_state
         self.ui.last_clicked_node = None
 
-        self.winner = logic.is_game_over(player, self.logger)
+        self.winner = self.connectivity.winner(player)
+        if self.winner is not None:
+            for instrument in self.instruments:
+                instrument.on_game_end(self)
 
     def human_turn(self):
         """Validates a human tile selection.
@@ -169,13 +223,33 @@ class Game:
         Returns:
             int: index of a valid and unoccupied node on the board
         """
-        # Retrieve the proper strategy constructor (cf. strategy.py)
-        StrategyConstructor = str2strat[strategy_name]
-        strategy = StrategyConstructor(
-            _board_state=self.logger,
-            player=player
-        )
-        return strategy.start()
+        # The strategy is built once, so that it can keep its caches
+        # from one turn to the next. It is given the board itself,
+        # which it sees updated, and is notified of every move.
+        if player not in self.players:
+            # Build the proper strategy (cf. strategy.py), with a seed
+            # of its own so that the two players draw different moves
+            options = self.options
+            if options.get("seed") is not None:
+                options = dict(options, seed=options["seed"] * 2 + player)
+            self.players[player] = make_player(
+                strategy_name, self.logger, player, options
+            )
+        strategy = self.players[player]
+
+        start = time.perf_counter()
+        node = strategy.start()
+        self.think_time = time.perf_counter() - start
+        self.move_stats = strategy.stats.as_dict()
+        return node
+
+    def record(self, seed=None) -> dict:
+        """
+        @return   The record of the finished game (cf. results.py).
+        """
+        return make_record(self.strategies, self.board_size,
+                           self.black_starts, self.winner, self.moves,
+                           sequence=self.sequence, seed=seed)
 
     def get_current_player(self):
         return self.turn[self.turn_state]
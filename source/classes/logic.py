@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import List, Optional
 
 import numpy as np
@@ -5,6 +6,13 @@ BLACK_PLAYER = 1
 WHITE_PLAYER = 2
 player2str = {1: 'Black', 2: 'White'}
 
+# Offsets of the six neighbours of a node, in the order of
+# get_neighbours
+NEIGHBOUR_OFFSETS = ((-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0))
+# Offsets of the six nodes forming a bridge with a node: they share
+# two neighbours with it, so that the two stones cannot be cut
+BRIDGE_OFFSETS = ((-2, 1), (-1, 2), (1, 1), (2, -1), (1, -2), (-1, -1))
+
 
 def get_possible_moves(board: np.ndarray) -> list:
     """
@@ -27,13 +35,11 @@ def is_game_over(player: int, board: np.ndarray) -> Optional[int]:
     """
     @return   The winning player:  1 or 2 (or None if the game is
               over by lack of playable position!)
+
+    This rebuilds the connectivity of the whole board: callers that
+    place stones one at a time should keep a `Connectivity` instead.
     """
-    get_border = (lambda i: (i, 0)) if player == BLACK_PLAYER else (lambda i: (0, i))
-    for i in range(board.shape[0]):
-        path = traverse(get_border(i), player, board, {})
-        if path:
-            return player
-    return None
+    return Connectivity.from_board(board).winner(player)
 
 
 def is_border(node: tuple, player: int, board_size: int) -> bool:
@@ -42,10 +48,8 @@ def is_border(node: tuple, player: int, board_size: int) -> bool:
               belongs to the given player.
     """
     (x, y) = node
-    return (
-        player == BLACK_PLAYER and y == board_size - 1 or
-        player == WHITE_PLAYER and x == board_size - 1
-    )
+    topology = get_topology(board_size)
+    return topology.is_end[player][x * board_size + y]
 
 
 def traverse(node: tuple, player: int, board: np.ndarray,
@@ -61,11 +65,12 @@ def traverse(node: tuple, player: int, board: np.ndarray,
     if board[x][y] == player:
         visited[node] = 1
 
-        if is_border(node, player, board.shape[0]):
+        topology = get_topology(board.shape[0])
+        index = x * topology.board_size + y
+        if topology.is_end[player][index]:
             return visited
 
-        neighbours = get_neighbours(node, board.shape[0])
-        for neighbour in neighbours:
+        for neighbour in topology.neighbour_nodes[index]:
             res = traverse(neighbour, player, board, visited)
             if res:
                 return res
@@ -77,12 +82,7 @@ def get_neighbours(coordinates: tuple, board_size: int) -> list:
     @return   a list of the neighbours of "coordinates" node
     """
     (x, y) = coordinates
-    return [
-        node for row in range(-1, 2) for col in range(-1, 2)
-        if row != col
-        for node in [ (x + row, y + col) ]
-        if is_valid(node, board_size)
-    ]
+    return list(get_topology(board_size).neighbour_nodes[x * board_size + y])
 
 
 def is_valid(coordinates: tuple, board_size: int) -> bool:
@@ -98,3 +98,196 @@ def is_node_free(coordinates: tuple, board: np.ndarray) -> bool:
     """
     (x, y) = coordinates
     return not board[x][y]
+
+
+class Topology:
+    """
+    The adjacency of the nodes of a board of a given size, computed
+    once per size (see get_topology) so that hot loops only index
+    arrays. Node (x, y) has the flat index x * board_size + y.
+
+    Attributes:
+        * neighbours: (n_cells, 6) array of the flat indices of the
+          neighbours of each node, padded with the sentinel n_cells,
+        * adjacency: the same without the padding, as tuples (faster
+          to iterate over from Python than an array),
+        * neighbour_nodes: the same as (x, y) tuples,
+        * bridges: the flat indices of the nodes forming a bridge
+          with each node,
+        * center_distance: the number of moves from each node to the
+          center of the board,
+        * borders: the (start, end) boolean masks of the flat nodes
+          on each border of each player,
+        * is_start, is_end: the same as tuples of booleans.
+    """
+    def __init__(self, board_size: int):
+        n = board_size
+        self.board_size = n
+        self.n_cells = n * n
+        self.nodes = tuple((x, y) for x in range(n) for y in range(n))
+
+        self.neighbour_nodes = tuple(
+            tuple((x + dx, y + dy) for (dx, dy) in NEIGHBOUR_OFFSETS
+                  if 0 <= x + dx < n and 0 <= y + dy < n)
+            for (x, y) in self.nodes
+        )
+        self.adjacency = tuple(
+            tuple(nx * n + ny for (nx, ny) in nodes)
+            for nodes in self.neighbour_nodes
+        )
+        self.bridges = tuple(
+            tuple((x + dx) * n + y + dy for (dx, dy) in BRIDGE_OFFSETS
+                  if 0 <= x + dx < n and 0 <= y + dy < n)
+            for (x, y) in self.nodes
+        )
+        center = (n - 1) / 2
+        self.center_distance = tuple(
+            max(abs(x - center), abs(y - center), abs(x + y - 2 * center))
+            for (x, y) in self.nodes
+        )
+        self.neighbours = np.full((self.n_cells, 6), self.n_cells,
+                                  dtype=np.intp)
+        for index, indices in enumerate(self.adjacency):
+            self.neighbours[index, :len(indices)] = indices
+
+        # Black connects the first and last columns, white the first
+        # and last rows
+        x, y = np.divmod(np.arange(self.n_cells), n)
+        self.borders = {
+            BLACK_PLAYER: (y == 0, y == n - 1),
+            WHITE_PLAYER: (x == 0, x == n - 1),
+        }
+        self.is_start = {player: tuple(start.tolist())
+                         for player, (start, _) in self.borders.items()}
+        self.is_end = {player: tuple(end.tolist())
+                       for player, (_, end) in self.borders.items()}
+
+
+@lru_cache(maxsize=None)
+def get_topology(board_size: int) -> Topology:
+    """
+    @return   The (shared, read only) topology of a board of the given
+              size.
+    """
+    return Topology(board_size)
+
+
+class Connectivity:
+    """
+    Incremental union-find over the cells of the board.
+
+    Each player owns two virtual border nodes (one per border to
+    connect) so that a win is simply both of them being in the same
+    set. Placing a stone costs a handful of `find`s instead of a
+    traversal of the whole board.
+
+    When `undoable` is set, path compression is disabled and every
+    `place` records its unions so that `undo` can revert it: this is
+    what search algorithms need to walk the game tree on a single
+    structure.
+    """
+    def __init__(self, board_size: int, undoable: bool = False):
+        n_cells = board_size * board_size
+        self.board_size = board_size
+        self.topology = get_topology(board_size)
+        self.undoable = undoable
+        self.cells = [0] * n_cells
+        self.parent = list(range(n_cells + 4))
+        self.size = [1] * (n_cells + 4)
+        self.history = []
+        # Virtual nodes: (start, end) border of each player
+        self.borders = {
+            BLACK_PLAYER: (n_cells, n_cells + 1),
+            WHITE_PLAYER: (n_cells + 2, n_cells + 3)
+        }
+
+    @classmethod
+    def from_board(cls, board: np.ndarray, undoable: bool = False):
+        """
+        @return   A connectivity structure holding every stone of
+                  board.
+        """
+        connectivity = cls(board.shape[0], undoable=undoable)
+        for player in (BLACK_PLAYER, WHITE_PLAYER):
+            for node in get_player_tiles(board, player):
+                connectivity.place(node, player)
+        return connectivity
+
+    def find(self, index: int) -> int:
+        """
+        @return   The representative of the set containing index.
+        """
+        parent = self.parent
+        if self.undoable:
+            while parent[index] != index:
+                index = parent[index]
+            return index
+        while parent[index] != index:
+            # Path halving
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def _union(self, a: int, b: int, changes: list) -> None:
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.size[a] > self.size[b]:
+            a, b = b, a
+        self.parent[a] = b
+        self.size[b] += self.size[a]
+        changes.append((a, b))
+
+    def place(self, node: tuple, player: int) -> None:
+        """
+        Adds a stone of player on node and merges it with its
+        neighbours of the same colour and with the borders it
+        touches.
+        """
+        (x, y) = node
+        topology = self.topology
+        index = x * self.board_size + y
+        changes = []
+        cells = self.cells
+        cells[index] = player
+
+        for neighbour in topology.adjacency[index]:
+            if cells[neighbour] == player:
+                self._union(index, neighbour, changes)
+
+        start, end = self.borders[player]
+        if topology.is_start[player][index]:
+            self._union(index, start, changes)
+        if topology.is_end[player][index]:
+            self._union(index, end, changes)
+
+        if self.undoable:
+            self.history.append((index, changes))
+
+    def undo(self) -> None:
+        """
+        Removes the last placed stone. Only valid if undoable.
+        """
+        index, changes = self.history.pop()
+        for (a, b) in reversed(changes):
+            self.parent[a] = a
+            self.size[b] -= self.size[a]
+        self.cells[index] = 0
+
+    def is_connected(self, player: int) -> bool:
+        """
+        @return   True iff player connects its two borders.
+        """
+        start, end = self.borders[player]
+        return self.find(start) == self.find(end)
+
+    def winner(self, player: Optional[int] = None) -> Optional[int]:
+        """
+        @return   The winning player, or None. If player is given,
+                  only this player is checked (as for is_game_over).
+        """
+        players = (BLACK_PLAYER, WHITE_PLAYER) if player is None else (player,)
+        for p in players:
+            if self.is_connected(p):
+                return p
+        return None
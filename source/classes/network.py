@@ -0,0 +1,313 @@
+import os
+import json
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+import classes.logic as logic
+
+# Policy / value network in pure NumPy.
+#
+# Positions are seen by the player to move: when white is to move, the
+# board is transposed and the colours swapped (cf. symmetry.py), so
+# that the network always plays the side connecting the first and last
+# columns. The input planes are the stones of the player to move, the
+# opponent's stones and the empty cells, on a board padded with one row
+# and column of each edge: the player's edges count as its stones, the
+# opponent's as the opponent's.
+#
+# The trunk is a stack of hex convolutions: 3x3 convolutions without
+# the two corners of the kernel that are not neighbours of the center
+# cell on the Hex grid, i.e. over the center and its six neighbours.
+# Being local, they apply to every board size. The heads are
+#   * the policy: a 1x1 convolution giving a logit per cell,
+#   * the value: the mean of the features over the board, then a
+#     hidden layer and a tanh. It estimates the outcome for the player
+#     to move, from -1 (lost) to 1 (won).
+#
+# Weights are saved in a directory: network.json holds the shape of the
+# network and each parameter is a .npy file, loaded memory mapped so
+# that all the processes using a network share its pages.
+
+CONFIG = "network.json"
+# Offsets of the cells of a hex convolution: the center, then its
+# neighbours
+KERNEL_OFFSETS = ((0, 0),) + logic.NEIGHBOUR_OFFSETS
+# Input planes: own stones, opponent's stones, empty cells
+PLANES = 3
+
+
+class Network:
+    """
+    The parameters of a network and its batched forward pass. params
+    maps the names of the parameters to arrays:
+        * conv<i>.w, conv<i>.b: weights (7 * inputs, channels) and
+          biases (channels) of the hex convolution i,
+        * policy.w, policy.b: the policy head (channels, 1), (1),
+        * value1.w, value1.b, value2.w, value2.b: the hidden layer
+          (channels, hidden), (hidden) and output (hidden, 1), (1) of
+          the value head.
+    """
+    def __init__(self, params: dict, config: dict):
+        self.params = params
+        self.config = config
+        self.layers = config["layers"]
+
+    @classmethod
+    def random(cls, channels: int = 32, layers: int = 4, hidden: int = 32,
+               seed: Optional[int] = None):
+        """
+        @return   A network of the given shape with random weights (He
+                  initialisation).
+        """
+        rng = np.random.default_rng(seed)
+
+        def dense(inputs, outputs):
+            scale = np.sqrt(2. / inputs)
+            return (rng.normal(0., scale, (inputs, outputs)).astype(np.float32),
+                    np.zeros(outputs, dtype=np.float32))
+
+        params = {}
+        inputs = PLANES
+        for i in range(layers):
+            params[f"conv{i}.w"], params[f"conv{i}.b"] = dense(
+                len(KERNEL_OFFSETS) * inputs, channels)
+            inputs = channels
+        params["policy.w"], params["policy.b"] = dense(channels, 1)
+        params["value1.w"], params["value1.b"] = dense(channels, hidden)
+        params["value2.w"], params["value2.b"] = dense(hidden, 1)
+        config = {"channels": channels, "layers": layers, "hidden": hidden}
+        return cls(params, config)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True):
+        """
+        @return   The network saved in directory, its parameters being
+                  memory mapped (read only) unless mmap is False.
+        """
+        with open(os.path.join(directory, CONFIG)) as file:
+            config = json.load(file)
+        params = {
+            name: np.load(os.path.join(directory, f"{name}.npy"),
+                          mmap_mode="r" if mmap else None)
+            for name in config["params"]
+        }
+        return cls(params, config)
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        for name, value in self.params.items():
+            np.save(os.path.join(directory, f"{name}.npy"),
+                    np.asarray(value, dtype=np.float32))
+        config = dict(self.config, params=sorted(self.params))
+        with open(os.path.join(directory, CONFIG), "w") as file:
+            json.dump(config, file, indent=2)
+
+    def encode(self, cells: np.ndarray, to_move: np.ndarray) -> tuple:
+        """
+        @return   (planes, empty): the padded input planes, of shape
+                  (batch, n + 2, n + 2, PLANES), of the positions given
+                  by their flat cells (batch, n²) and player to move
+                  (batch), and the mask of their empty cells
+                  (batch, n, n), both seen by the player to move.
+        """
+        n = _board_size(cells)
+        boards = cells.reshape(-1, n, n)
+        boards = np.where(
+            (to_move == logic.WHITE_PLAYER)[:, None, None],
+            # The swapped colours of the transposed board
+            (3 - boards.transpose(0, 2, 1)) % 3, boards
+        )
+        planes = np.zeros((boards.shape[0], n + 2, n + 2, PLANES),
+                          dtype=np.float32)
+        planes[:, :, (0, n + 1), 0] = 1.
+        planes[:, (0, n + 1), :, 1] = 1.
+        inner = planes[:, 1:n + 1, 1:n + 1, :]
+        inner[..., 0] = boards == logic.BLACK_PLAYER
+        inner[..., 1] = boards == logic.WHITE_PLAYER
+        inner[..., 2] = boards == 0
+        return planes, boards == 0
+
+    def forward(self, planes: np.ndarray, empty: np.ndarray,
+                trace: bool = False) -> tuple:
+        """
+        @return   (logits, values) of a batch of encoded positions: the
+                  policy logits of each cell (-inf on the stones) and
+                  the value for the player to move, of shapes
+                  (batch, n, n) and (batch,). With trace, a third item
+                  holds the intermediate arrays, for backpropagation
+                  (cf. training.py): the inputs and outputs of each
+                  convolution, the mean features and the hidden layer
+                  of the value head.
+        """
+        params = self.params
+        inputs, outputs = [], []
+        x = planes
+        for i in range(self.layers):
+            if i:
+                x = pad(x)
+            inputs.append(x)
+            x = hex_conv(x, params[f"conv{i}.w"], params[f"conv{i}.b"])
+            np.maximum(x, 0., out=x)
+            outputs.append(x)
+
+        logits = (x @ params["policy.w"])[..., 0] + params["policy.b"][0]
+        logits = np.where(empty, logits, -np.inf)
+
+        mean = x.mean(axis=(1, 2))
+        hidden = np.maximum(mean @ params["value1.w"] + params["value1.b"], 0.)
+        values = np.tanh(hidden @ params["value2.w"] + params["value2.b"])[:, 0]
+        if trace:
+            return logits, values, {"inputs": inputs, "outputs": outputs,
+                                    "mean": mean, "hidden": hidden}
+        return logits, values
+
+    def evaluate(self, cells: np.ndarray, to_move: np.ndarray) -> tuple:
+        """
+        @return   (policy, values): the probabilities of the moves on
+                  each cell, (batch, n²), and the values for the player
+                  to move, (batch), of a batch of positions given by
+                  their flat cells (batch, n²) and player to move
+                  (batch).
+        """
+        cells = np.asarray(cells, dtype=np.int8)
+        to_move = np.asarray(to_move)
+        logits, values = self.forward(*self.encode(cells, to_move))
+        logits -= logits.max(axis=(1, 2), keepdims=True)
+        policy = np.exp(logits)
+        policy /= policy.sum(axis=(1, 2), keepdims=True)
+        # Back to the board of the white movers
+        policy = np.where((to_move == logic.WHITE_PLAYER)[:, None, None],
+                          policy.transpose(0, 2, 1), policy)
+        return policy.reshape(cells.shape), values
+
+
+def _board_size(cells: np.ndarray) -> int:
+    return int(round(np.sqrt(cells.shape[-1])))
+
+
+def hex_conv(x: np.ndarray, weights: np.ndarray,
+             bias: np.ndarray) -> np.ndarray:
+    """
+    @return   The hex convolution of the padded features x, of shape
+              (batch, n + 2, n + 2, inputs): the sum over the cells of
+              the kernel of the features shifted by their offset times
+              their block of the weights (7 * inputs, outputs).
+    """
+    n = x.shape[1] - 2
+    kernel = weights.reshape(len(KERNEL_OFFSETS), x.shape[3], -1)
+    out = None
+    for k, (dx, dy) in enumerate(KERNEL_OFFSETS):
+        shifted = x[:, 1 + dx:n + 1 + dx, 1 + dy:n + 1 + dy, :] @ kernel[k]
+        if out is None:
+            out = shifted
+        else:
+            out += shifted
+    out += bias
+    return out
+
+
+def pad(x: np.ndarray) -> np.ndarray:
+    """
+    @return   The features x of the cells, (batch, n, n, channels),
+              padded with zeros.
+    """
+    return np.pad(x, ((0, 0), (1, 1), (1, 1), (0, 0)))
+
+
+@lru_cache(maxsize=None)
+def get_network(directory: str) -> Network:
+    """
+    @return   The network saved in directory, loaded once per process.
+    """
+    return Network.load(directory)
+
+
+class NetworkEvaluator:
+    """
+    Scores positions with the value head of a network, like
+    `evaluation.Evaluator`, for the leaves of ABheur. The value
+    depends on the player to move, which is part of the cache key.
+
+    The children of a node are evaluated at once by `prefetch`, a
+    forward pass over a batch being much cheaper than as many single
+    ones.
+    """
+    def __init__(self, network: Network, board_size: int,
+                 cache_size: int = 2 ** 16, scale: float = 10.):
+        self.network = network
+        self.board_size = board_size
+        self.cache_size = cache_size
+        # Score of a certain win, below the scores of won games
+        self.scale = scale
+        self.cache = {}
+
+    def key(self, board, to_move: int, symmetric_keys=None) -> int:
+        if symmetric_keys is None:
+            return board.hash(to_move)
+        key, _ = symmetric_keys.canonical(to_move)
+        return key
+
+    def child_key(self, board, index: int, player: int,
+                  symmetric_keys=None) -> int:
+        """
+        @return   The key of the position after player plays on index.
+        """
+        if symmetric_keys is None:
+            return (board.key ^ board.zobrist[player][index]
+                    ^ board.zobrist["to_move"][3 - player])
+        keys = [k ^ c for (k, c) in zip(
+            symmetric_keys.keys, symmetric_keys.cell_keys[player][index])]
+        key, _ = symmetric_keys.symmetry.canonical(keys, 3 - player)
+        return key
+
+    def store(self, keys: list, values) -> None:
+        if len(self.cache) + len(keys) > self.cache_size:
+            self.cache.clear()
+        self.cache.update(zip(keys, values))
+
+    def value(self, board, to_move: int, symmetric_keys=None) -> float:
+        """
+        @return   The value of board, a HexBoard, for to_move.
+        """
+        key = self.key(board, to_move, symmetric_keys)
+        value = self.cache.get(key)
+        if value is None:
+            _, values = self.network.evaluate([board.cells()], [to_move])
+            value = float(values[0])
+            self.store([key], [value])
+        return value
+
+    def prefetch(self, board, player: int, moves: list,
+                 symmetric_keys=None) -> None:
+        """
+        Evaluates in one batch the positions after each of the moves
+        of player that are not in the cache yet.
+        """
+        n = self.board_size
+        cells = board.cells()
+        keys, batch = [], []
+        for (x, y) in moves:
+            index = int(x * n + y)
+            key = self.child_key(board, index, player, symmetric_keys)
+            if key not in self.cache:
+                child = cells.copy()
+                child[index] = player
+                keys.append(key)
+                batch.append(child)
+        if batch:
+            _, values = self.network.evaluate(
+                batch, [3 - player] * len(batch))
+            self.store(keys, values.tolist())
+
+    def score(self, board, player: int, symmetric_keys=None,
+              to_move: Optional[int] = None) -> float:
+        """
+        @return   The score of board for player, positive when player
+                  is ahead, to_move being the player to move (player
+                  by default).
+        """
+        to_move = player if to_move is None else to_move
+        value = self.value(board, to_move, symmetric_keys)
+        return self.scale * (value if to_move == player else -value)
@@ -0,0 +1,16 @@
+from typing import Optional
+
+
+class NoUI:
+    """
+    Stands for the UI when the game is not displayed. It does not
+    depend on pygame, so that headless games never load it.
+    """
+    def __init__(self, board_size: int):
+        self.last_clicked_node = None
+    def draw(self, strat, current_strategie):
+        pass
+    def update_tile_color(self, coordinates: tuple, player: Optional[int]):
+        pass
+    def handle_events(self, strat) -> None:
+        pass
@@ -0,0 +1,267 @@
+import itertools
+from functools import lru_cache
+
+import classes.logic as logic
+
+# Local Hex patterns used to shrink the set of moves searched:
+#   * dead cells: empty cells whose colour can never matter, as four
+#     consecutive neighbours have the same colour,
+#   * captured cells: pairs of adjacent empty cells where one player
+#     can answer the other's move in the pair by killing that stone,
+#   * bridges and edge templates (template II): two stones, or a stone
+#     and its edge, joined by two empty cells. When the opponent
+#     intrudes into one of the two, the other one saves the
+#     connection.
+# Playing a dead or captured cell is never better than some other
+# move, so those cells are left out of the candidate moves.
+#
+# Cells are flat indices x * board_size + y, positions are flat lists
+# of cells (cf. HexBoard.cells).
+
+# Status of the empty cells
+LIVE = 0
+DEAD = 1
+CAPTURED = 2
+
+# Colour of the cells off the board at the corners, which belong to
+# neither player: they are never part of a dead or captured run
+CORNER = 3
+
+# Offsets of the neighbours of a cell, in cyclic order: consecutive
+# neighbours are adjacent
+RING_OFFSETS = ((-1, 0), (-1, 1), (0, 1), (1, 0), (1, -1), (0, -1))
+
+
+def _ring_status(colours: tuple):
+    """
+    @return   The status of an empty cell given the colours of its ring
+              of neighbours: DEAD if four consecutive ones have the same
+              colour, else the (i, player) such that the cell and its
+              empty neighbour i may be captured by player (their two
+              common neighbours, i - 1 and i + 1, and one more neighbour
+              of the cell next to them, belong to player). The same
+              must then hold for the neighbour (see Patterns.status).
+    """
+    for player in (logic.BLACK_PLAYER, logic.WHITE_PLAYER):
+        run = 0
+        # Twice around the ring, for the runs crossing its start
+        for colour in colours + colours:
+            run = run + 1 if colour == player else 0
+            if run >= 4:
+                return DEAD
+    pairs = []
+    for i, colour in enumerate(colours):
+        player = colours[i - 1]
+        if (colour == 0 and player in (logic.BLACK_PLAYER, logic.WHITE_PLAYER)
+                and colours[(i + 1) % 6] == player
+                and player in (colours[i - 2], colours[(i + 2) % 6])):
+            pairs.append((i, player))
+    return tuple(pairs)
+
+
+# Status of every ring of colours (0, the players or CORNER)
+RING_STATUS = {
+    colours: _ring_status(colours)
+    for colours in itertools.product(range(4), repeat=6)
+}
+
+
+class Patterns:
+    """
+    The cell-level tables of the patterns for a board of a given size
+    (see get_patterns). The functions taking the cells of a position
+    expect them extended by `extend`, with the colours of the edges.
+        * ring: the six neighbours of each cell in cyclic order, off
+          the board the edges are seen as stones of the player owning
+          them, and the corners as CORNER, which belongs to neither,
+        * bridge_carriers: for each cell c, the (a, b, other) such
+          that a and b form a bridge whose two carrier cells are c
+          and other,
+        * edge_carriers: for each player and cell c of one of its
+          edges, the (a, other) such that a is on the second row and
+          its two neighbours on the edge are c and other.
+    """
+    def __init__(self, board_size: int):
+        n = board_size
+        self.topology = topology = logic.get_topology(n)
+        n_cells = topology.n_cells
+        # Indices of the edges and corners in the extended cells
+        edges = {logic.BLACK_PLAYER: n_cells, logic.WHITE_PLAYER: n_cells + 1,
+                 CORNER: n_cells + 2}
+        self.edge_colours = [logic.BLACK_PLAYER, logic.WHITE_PLAYER, CORNER]
+
+        def cell(x, y):
+            inside_x, inside_y = 0 <= x < n, 0 <= y < n
+            if inside_x and inside_y:
+                return x * n + y
+            if inside_x:
+                # Black owns the first and last columns
+                return edges[logic.BLACK_PLAYER]
+            if inside_y:
+                return edges[logic.WHITE_PLAYER]
+            return edges[CORNER]
+
+        self.ring = tuple(
+            tuple(cell(x + dx, y + dy) for (dx, dy) in RING_OFFSETS)
+            for (x, y) in topology.nodes
+        )
+
+        carriers = [[] for _ in range(n_cells)]
+        for a in range(n_cells):
+            for b in topology.bridges[a]:
+                if a < b:
+                    c, other = sorted(set(topology.adjacency[a])
+                                      & set(topology.adjacency[b]))
+                    carriers[c].append((a, b, other))
+                    carriers[other].append((a, b, c))
+        self.bridge_carriers = tuple(tuple(c) for c in carriers)
+
+        self.edge_carriers = {}
+        for player in (logic.BLACK_PLAYER, logic.WHITE_PLAYER):
+            carriers = [[] for _ in range(n_cells)]
+            for a in range(n_cells):
+                if topology.is_start[player][a] or topology.is_end[player][a]:
+                    continue
+                for edge in topology.borders[player]:
+                    below = [c for c in topology.adjacency[a] if edge[c]]
+                    if len(below) == 2:
+                        c, other = below
+                        carriers[c].append((a, other))
+                        carriers[other].append((a, c))
+            self.edge_carriers[player] = tuple(tuple(c) for c in carriers)
+
+    def extend(self, cells: list) -> list:
+        """
+        @return   cells (e.g. from HexBoard.cells) followed by the
+                  colours of the edges, as read by the other methods.
+        """
+        return cells + self.edge_colours
+
+    def status(self, cells: list, index: int) -> int:
+        """
+        @return   The status of the empty cell index: DEAD, CAPTURED or
+                  LIVE.
+        """
+        ring = self.ring[index]
+        status = RING_STATUS[tuple([cells[c] for c in ring])]
+        if status == DEAD:
+            return DEAD
+        # Captured pair: whichever of the two cells the opponent
+        # plays, the player takes the other one, and the opponent's
+        # stone is dead
+        for (i, player) in status:
+            neighbour = ring[i]
+            around = self.ring[neighbour]
+            k = around.index(index)
+            if player in (cells[around[k - 2]], cells[around[(k + 2) % 6]]):
+                return CAPTURED
+        return LIVE
+
+    def candidates(self, cells: list) -> list:
+        """
+        @return   The empty cells that are neither dead nor captured
+                  (all the empty cells if there are none), given the
+                  cells of a HexBoard.
+        """
+        extended = self.extend(cells)
+        empty = [i for (i, c) in enumerate(cells) if c == 0]
+        live = [i for i in empty if self.status(extended, i) == LIVE]
+        return live or empty
+
+    def responses(self, cells: list, player: int, intrusion: int) -> list:
+        """
+        @return   The cells where player restores the bridges and edge
+                  templates broken by the opponent's stone on
+                  intrusion.
+        """
+        responses = []
+        for (a, b, other) in self.bridge_carriers[intrusion]:
+            if cells[a] == player and cells[b] == player and not cells[other]:
+                responses.append(other)
+        for (a, other) in self.edge_carriers[player][intrusion]:
+            if cells[a] == player and not cells[other]:
+                responses.append(other)
+        return responses
+
+
+@lru_cache(maxsize=None)
+def get_patterns(board_size: int) -> Patterns:
+    """
+    @return   The (shared, read only) pattern tables of a board of the
+              given size.
+    """
+    return Patterns(board_size)
+
+
+class PatternEngine:
+    """
+    The status of every empty cell of a position, updated as stones
+    are played and taken back, for the searches that walk the game
+    tree with make/unmake. A stone only changes the status of the
+    cells at most two steps away, which are the only ones checked.
+    """
+    def __init__(self, board_size: int):
+        self.patterns = get_patterns(board_size)
+        self.topology = self.patterns.topology
+        # Extended with the colours of the edges (cf. Patterns.extend)
+        self.cells = self.patterns.extend([0] * self.topology.n_cells)
+        self.status = [LIVE] * self.topology.n_cells
+        # Cells around each cell whose status depends on it
+        self.around = tuple(
+            tuple({c for b in self.topology.adjacency[a]
+                   for c in self.topology.adjacency[b]} - {a})
+            for a in range(self.topology.n_cells)
+        )
+        self.history = []
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        @return   An engine holding the stones of board, a HexBoard.
+        """
+        engine = cls(board.board_size)
+        engine.cells = engine.patterns.extend(board.cells())
+        engine.status = [
+            LIVE if c else engine.patterns.status(engine.cells, i)
+            for (i, c) in enumerate(engine.cells[:engine.topology.n_cells])
+        ]
+        return engine
+
+    def play(self, index: int, player: int) -> None:
+        cells, status = self.cells, self.status
+        cells[index] = player
+        changes = []
+        if status[index] != LIVE:
+            changes.append((index, status[index]))
+            status[index] = LIVE
+        for c in self.around[index]:
+            if cells[c]:
+                continue
+            new = self.patterns.status(cells, c)
+            if new != status[c]:
+                changes.append((c, status[c]))
+                status[c] = new
+        self.history.append((index, changes))
+
+    def undo(self) -> None:
+        index, changes = self.history.pop()
+        self.cells[index] = 0
+        for (c, old) in changes:
+            self.status[c] = old
+
+    def candidates(self) -> list:
+        """
+        @return   The live empty cells (all the empty cells if there
+                  are none).
+        """
+        cells, status = self.cells, self.status
+        empty = [i for i in range(self.topology.n_cells) if cells[i] == 0]
+        live = [i for i in empty if status[i] == LIVE]
+        return live or empty
+
+    def responses(self, player: int, intrusion: int) -> list:
+        """
+        @return   The cells restoring the connections of player broken
+                  by the stone on intrusion.
+        """
+        return self.patterns.responses(self.cells, player, intrusion)
@@ -0,0 +1,164 @@
+import os
+import csv
+import json
+from math import sqrt
+
+import classes.logic as logic
+from classes.stats import total_stats
+
+# Results of the games of tournaments, one record per game, appended to
+# a file as soon as the game is over. The format follows the extension
+# of the file: CSV (.csv) or JSON lines (anything else).
+
+# Columns of a record. Per-move lists are JSON encoded in CSV files.
+FIELDS = [
+    "black", "white", "board_size", "starter", "winner", "moves",
+    "black_time", "white_time", "black_nodes", "white_nodes",
+    "think_times", "nodes", "stats", "sequence", "seed",
+]
+LIST_FIELDS = ("think_times", "nodes", "stats", "sequence")
+
+
+class ResultsWriter:
+    """
+    Appends game records to a results file, without reading it. The
+    file is opened for each record, so that everything written so far
+    is kept if a run is interrupted.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.csv = path.endswith(".csv")
+
+    def write(self, record: dict) -> None:
+        record = {field: record.get(field) for field in FIELDS}
+        if self.csv:
+            new_file = not os.path.exists(self.path) or not os.path.getsize(self.path)
+            for field in LIST_FIELDS:
+                record[field] = json.dumps(record[field])
+            with open(self.path, "a", newline="") as file:
+                writer = csv.DictWriter(file, fieldnames=FIELDS)
+                if new_file:
+                    writer.writeheader()
+                writer.writerow(record)
+        else:
+            with open(self.path, "a") as file:
+                file.write(json.dumps(record) + "\n")
+
+
+def read_records(path: str):
+    """
+    @return   An iterator over the records of a results file, with their
+              per-move lists decoded.
+    """
+    if path.endswith(".csv"):
+        with open(path, newline="") as file:
+            for record in csv.DictReader(file):
+                for field in LIST_FIELDS:
+                    record[field] = json.loads(record.get(field) or "null")
+                for field in ("board_size", "starter", "winner", "moves"):
+                    record[field] = int(record[field])
+                yield record
+    else:
+        with open(path) as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def make_record(strategies: dict, board_size: int, black_starts: bool,
+                winner: int, moves: list, sequence=None,
+                seed=None) -> dict:
+    """
+    @return   The record of a game, given the strategy of each player,
+              the (player, think time, search counters) of each move
+              and the cells played, as flat indices x * board_size + y
+              ("sequence", to replay the game). "stats" holds the total
+              counters of each player.
+    """
+    record = {
+        "black": strategies[logic.BLACK_PLAYER],
+        "white": strategies[logic.WHITE_PLAYER],
+        "board_size": board_size,
+        "starter": logic.BLACK_PLAYER if black_starts else logic.WHITE_PLAYER,
+        "winner": winner,
+        "moves": len(moves),
+        "think_times": [think_time for (_, think_time, _) in moves],
+        "nodes": [stats.get("nodes", 0) for (_, _, stats) in moves],
+        "stats": {},
+        "sequence": sequence,
+        "seed": seed,
+    }
+    for player, name in ((logic.BLACK_PLAYER, "black"),
+                         (logic.WHITE_PLAYER, "white")):
+        record[f"{name}_time"] = sum(
+            think_time or 0. for (p, think_time, _) in moves if p == player)
+        record["stats"][name] = total_stats(moves, player)
+        record[f"{name}_nodes"] = record["stats"][name]["nodes"]
+    return record
+
+
+def wilson(wins: int, games: int, z: float = 1.96) -> tuple:
+    """
+    @return   The Wilson score interval of the winrate wins / games
+              (95% confidence by default).
+    """
+    if games == 0:
+        return 0., 1.
+    p = wins / games
+    center = (p + z * z / (2 * games)) / (1 + z * z / games)
+    margin = (z / (1 + z * z / games)
+              * sqrt(p * (1 - p) / games + z * z / (4 * games * games)))
+    return max(0., center - margin), min(1., center + margin)
+
+
+def aggregate(paths: list, chunksize: int = 100_000):
+    """
+    Reads the results files by chunks of chunksize records, so that
+    files of millions of games are never loaded at once.
+
+    @return   A DataFrame with, for each pairing (black, white,
+              board_size): the number of games, the winrate of black
+              and its confidence interval, the mean number of moves and
+              the mean think time and nodes per move of each player.
+    """
+    import pandas as pd
+
+    keys = ["black", "white", "board_size"]
+    sums = ["games", "black_wins", "moves", "black_moves", "white_moves",
+            "black_time", "white_time", "black_nodes", "white_nodes"]
+    columns = keys + ["starter", "winner", "moves", "black_time",
+                      "white_time", "black_nodes", "white_nodes"]
+    totals = None
+
+    for path in paths:
+        if path.endswith(".csv"):
+            chunks = pd.read_csv(path, usecols=columns, chunksize=chunksize)
+        else:
+            chunks = pd.read_json(path, lines=True, chunksize=chunksize)
+        for chunk in chunks:
+            chunk = chunk[columns].assign(
+                games=1,
+                black_wins=(chunk["winner"] == logic.BLACK_PLAYER).astype(int),
+                # The starter plays the extra move of odd games
+                black_moves=(chunk["moves"]
+                             + (chunk["starter"] == logic.BLACK_PLAYER)) // 2,
+            )
+            chunk["white_moves"] = chunk["moves"] - chunk["black_moves"]
+            partial = chunk.groupby(keys)[sums].sum()
+            totals = partial if totals is None else totals.add(partial, fill_value=0)
+
+    if totals is None:
+        return pd.DataFrame()
+
+    summary = pd.DataFrame(index=totals.index)
+    summary["games"] = totals["games"].astype(int)
+    summary["black_winrate"] = totals["black_wins"] / totals["games"]
+    intervals = [wilson(w, g) for w, g in zip(totals["black_wins"], totals["games"])]
+    summary["ci_low"] = [low for (low, _) in intervals]
+    summary["ci_high"] = [high for (_, high) in intervals]
+    summary["moves"] = totals["moves"] / totals["games"]
+    for name in ("black", "white"):
+        moves = totals[f"{name}_moves"].where(totals[f"{name}_moves"] > 0)
+        summary[f"{name}_time_per_move"] = totals[f"{name}_time"] / moves
+        summary[f"{name}_nodes_per_move"] = totals[f"{name}_nodes"] / moves
+    return summary.reset_index()
@@ -0,0 +1,108 @@
+import numpy as np
+
+import classes.logic as logic
+
+# Random playouts of many boards at once. Boards are stacked along the
+# first axis of (k, n, n) arrays and processed with array operations
+# instead of one Python loop per playout.
+
+
+def fill(board: np.ndarray, to_move: int, k: int,
+         rng: np.random.Generator) -> np.ndarray:
+    """
+    @return   k copies of board, each with its empty cells filled at
+              random, to_move playing first. Each copy assigns the
+              colours by a random permutation of the empty cells: the
+              first half (rounded up) goes to to_move.
+    """
+    n = board.shape[0]
+    flat = board.reshape(-1)
+    empty = np.flatnonzero(flat == 0)
+    boards = np.repeat(flat[np.newaxis, :], k, axis=0)
+
+    # A random permutation of the empty cells per board
+    permutations = rng.random((k, len(empty))).argsort(axis=1)
+    half = (len(empty) + 1) // 2
+    boards[:, empty] = np.where(permutations < half, to_move, 3 - to_move)
+    return boards.reshape((k, n, n))
+
+
+def dilate(reached: np.ndarray) -> np.ndarray:
+    """
+    @return   The cells of reached, a (k, n, n) boolean array, and all
+              their neighbours (cf. logic.get_neighbours).
+    """
+    grown = reached.copy()
+    grown[:, 1:, :] |= reached[:, :-1, :]
+    grown[:, :-1, :] |= reached[:, 1:, :]
+    grown[:, :, 1:] |= reached[:, :, :-1]
+    grown[:, :, :-1] |= reached[:, :, 1:]
+    grown[:, 1:, :-1] |= reached[:, :-1, 1:]
+    grown[:, :-1, 1:] |= reached[:, 1:, :-1]
+    return grown
+
+
+def connected(boards: np.ndarray, player: int) -> np.ndarray:
+    """
+    @return   For each of the (k, n, n) boards, True iff player
+              connects its borders. The stones reached from the first
+              border are dilated, restricted to the player's stones,
+              until no board changes.
+    """
+    stones = boards == player
+    if player == logic.BLACK_PLAYER:
+        # Black connects the first and last columns
+        stones = stones.transpose((0, 2, 1))
+    reached = np.zeros_like(stones)
+    reached[:, 0, :] = stones[:, 0, :]
+    while True:
+        grown = dilate(reached) & stones
+        if np.array_equal(grown, reached):
+            break
+        reached = grown
+    return reached[:, -1, :].any(axis=1)
+
+
+def winners(boards: np.ndarray) -> np.ndarray:
+    """
+    @return   The winner of each of the (k, n, n) full boards. Hex has
+              no draw: white wins wherever black does not.
+    """
+    return np.where(
+        connected(boards, logic.BLACK_PLAYER),
+        logic.BLACK_PLAYER, logic.WHITE_PLAYER
+    )
+
+
+def batch_playouts(board: np.ndarray, to_move: int, k: int,
+                   rng: np.random.Generator) -> np.ndarray:
+    """
+    @return   The winners of k random playouts from board.
+    """
+    return winners(fill(board, to_move, k, rng))
+
+
+def move_winrates(board: np.ndarray, player: int, playouts: int,
+                  rng: np.random.Generator, chunk: int = 8192,
+                  moves: list = None) -> dict:
+    """
+    Flat Monte Carlo evaluation of the moves of player (all of them
+    by default).
+
+    @return   {move: share of the playouts won by player after move}
+    """
+    if moves is None:
+        moves = logic.get_possible_moves(board)
+    per_chunk = max(1, chunk // playouts)
+    winrates = {}
+    for i in range(0, len(moves), per_chunk):
+        batch = moves[i:i + per_chunk]
+        boards = []
+        for (x, y) in batch:
+            after = board.copy()
+            after[x][y] = player
+            boards.append(fill(after, 3 - player, playouts, rng))
+        won = winners(np.concatenate(boards)) == player
+        for move, wins in zip(batch, won.reshape((len(batch), playouts))):
+            winrates[move] = wins.mean()
+    return winrates
@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import shutil
+import random
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import classes.logic as logic
+from classes.game import Game
+from classes.stats import Instrument
+
+# Self-play data: headless games of a strategy against itself, whose
+# positions are recorded with the move played, the visits of the moves
+# by the search and the result of the game (cf. train.py).
+#
+# Games are played by shards of a fixed number of games, each shard by
+# one worker process which writes its own file, so that workers never
+# exchange positions. Shard i holds the games i * games_per_shard to
+# (i + 1) * games_per_shard - 1, every game being seeded by its number:
+# an interrupted run is resumed by playing the shards that are missing.
+#
+# A shard is either a compressed .npz file or, uncompressed, a
+# directory of .npy files that can be memory mapped. Both are written
+# under a temporary name and renamed once complete. Their arrays, one
+# row per position:
+#   * cells: the flat cells (n²,) of the position before the move,
+#   * to_move: the player to move,
+#   * moves: the cell played,
+#   * visits: the share of the visits (n²,) of each cell by the search,
+#     all on the move played for strategies that do not count visits,
+#   * results: 1 if the player to move won the game, -1 otherwise,
+#   * game_ids: the number of the game.
+
+CONFIG = "selfplay.json"
+ARRAYS = ("cells", "to_move", "moves", "visits", "results", "game_ids")
+
+
+class Recorder(Instrument):
+    """
+    Records the positions of the games and the moves the players chose
+    in them. The moves no player chose (e.g. random openings) are
+    skipped.
+    """
+    def __init__(self):
+        self.rows = {name: [] for name in ARRAYS}
+        self.game_rows = []
+
+    def on_game_start(self, game) -> None:
+        self.game_rows = []
+
+    def on_move(self, game, player, node, think_time, stats) -> None:
+        if think_time is None:
+            return
+        n = game.board_size
+        index = int(node[0]) * n + int(node[1])
+        cells = game.logger.reshape(-1).copy()
+        # The position before the move
+        cells[index] = 0
+
+        visits = np.zeros(n * n, dtype=np.float32)
+        counts = game.players[player].visit_counts()
+        if counts:
+            for (x, y), count in counts.items():
+                visits[int(x) * n + int(y)] = count
+            visits /= visits.sum()
+        else:
+            visits[index] = 1.
+        self.game_rows.append((cells, player, index, visits))
+
+    def on_game_end(self, game) -> None:
+        for (cells, player, index, visits) in self.game_rows:
+            self.rows["cells"].append(cells)
+            self.rows["to_move"].append(player)
+            self.rows["moves"].append(index)
+            self.rows["visits"].append(visits)
+            self.rows["results"].append(1 if game.winner == player else -1)
+            self.rows["game_ids"].append(game.game_id)
+        self.game_rows = []
+
+    def arrays(self, board_size: int) -> dict:
+        """
+        @return   The arrays of the positions recorded so far.
+        """
+        n_cells = board_size * board_size
+        rows = self.rows
+        return {
+            "cells": np.array(rows["cells"], dtype=np.int8).reshape(-1, n_cells),
+            "to_move": np.array(rows["to_move"], dtype=np.int8),
+            "moves": np.array(rows["moves"], dtype=np.int16),
+            "visits": np.array(rows["visits"], dtype=np.float32).reshape(-1, n_cells),
+            "results": np.array(rows["results"], dtype=np.int8),
+            "game_ids": np.array(rows["game_ids"], dtype=np.int32),
+        }
+
+
+def shard_path(directory: str, index: int, compress: bool) -> str:
+    name = f"shard_{index:06d}"
+    return os.path.join(directory, name + ".npz" if compress else name)
+
+
+def list_shards(directory: str) -> list:
+    """
+    @return   The paths of the complete shards of directory, in order.
+    """
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.startswith("shard_") and not name.endswith(".tmp")
+        and not name.endswith(".tmp.npz")
+    )
+
+
+def write_shard(path: str, arrays: dict) -> None:
+    """
+    Writes a shard, compressed if path ends with .npz, under a
+    temporary name first so that a shard is either complete or absent.
+    """
+    if path.endswith(".npz"):
+        temporary = path[:-len(".npz")] + ".tmp.npz"
+        np.savez_compressed(temporary, **arrays)
+        os.replace(temporary, path)
+    else:
+        temporary = path + ".tmp"
+        shutil.rmtree(temporary, ignore_errors=True)
+        os.makedirs(temporary)
+        for name, array in arrays.items():
+            np.save(os.path.join(temporary, f"{name}.npy"), array)
+        os.replace(temporary, path)
+
+
+def load_shard(path: str, mmap: bool = True) -> dict:
+    """
+    @return   The arrays of a shard. Those of uncompressed shards are
+              memory mapped unless mmap is False; those of .npz shards
+              are read when accessed.
+    """
+    if path.endswith(".npz"):
+        return np.load(path)
+    return {
+        name: np.load(os.path.join(path, f"{name}.npy"),
+                      mmap_mode="r" if mmap else None)
+        for name in ARRAYS
+    }
+
+
+def _play_shard(args) -> tuple:
+    """
+    Plays the games of a shard, in a worker process, and writes it.
+    Each game is played by new players seeded from the seed of the
+    game (each with its own, cf. Game.ai_turn), its first
+    opening_moves moves being random, so that a shard only depends on
+    its number.
+
+    @return   (shard, games, positions)
+    """
+    (directory, index, board_size, strategy, options, games_per_shard,
+     opening_moves, seed, compress) = args
+    recorder = Recorder()
+    first = index * games_per_shard
+    for game_id in range(first, first + games_per_shard):
+        game_seed = seed + game_id
+        random.seed(game_seed)
+        np.random.seed(game_seed % 2 ** 32)
+        rng = random.Random(game_seed)
+        game = Game(board_size=board_size, strat=(strategy, strategy),
+                    black_starts=game_id % 2 == 0, use_ui=False,
+                    options=dict(options, seed=game_seed),
+                    instruments=[recorder], game_id=game_id)
+        for _ in range(opening_moves):
+            if game.winner is not None:
+                break
+            game.think_time, game.move_stats = None, {}
+            game.place(rng.choice(logic.get_possible_moves(game.logger)),
+                       game.get_current_player())
+        while game.winner is None:
+            game.play()
+
+    arrays = recorder.arrays(board_size)
+    write_shard(shard_path(directory, index, compress), arrays)
+    return index, games_per_shard, len(arrays["moves"])
+
+
+def self_play(directory: str, board_size: int, strategy: str,
+              options: dict, games: int, games_per_shard: int = 100,
+              jobs: int = 1, opening_moves: int = 2, seed: int = 0,
+              compress: bool = True) -> int:
+    """
+    Plays the games of a self-play run into directory, on jobs worker
+    processes, skipping the shards already written by a previous run
+    with the same settings. The number of games is rounded up to whole
+    shards.
+
+    @return   The number of positions recorded by this call.
+    """
+    log = logging.getLogger("rich")
+    os.makedirs(directory, exist_ok=True)
+    settings = {
+        "board_size": board_size, "strategy": strategy, "options": options,
+        "games_per_shard": games_per_shard, "opening_moves": opening_moves,
+        "seed": seed, "compress": compress,
+    }
+    config_path = os.path.join(directory, CONFIG)
+    if os.path.exists(config_path):
+        with open(config_path) as file:
+            saved = json.load(file)
+        if saved != settings:
+            raise ValueError(
+                f"{directory} holds a self-play run with other settings:"
+                f" {saved}")
+    else:
+        with open(config_path, "w") as file:
+            json.dump(settings, file, indent=2)
+
+    n_shards = -(-games // games_per_shard)
+    todo = [
+        index for index in range(n_shards)
+        if not os.path.exists(shard_path(directory, index, compress))
+    ]
+    if len(todo) < n_shards:
+        log.info(f"Resuming: {n_shards - len(todo)} of {n_shards} shards"
+                 f" already played")
+
+    jobs_args = [
+        (directory, index, board_size, strategy, options, games_per_shard,
+         opening_moves, seed, compress)
+        for index in todo
+    ]
+    start = time.perf_counter()
+    played = positions = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_play_shard, args) for args in jobs_args]
+        for future in as_completed(futures):
+            index, n_games, n_positions = future.result()
+            played += n_games
+            positions += n_positions
+            elapsed = time.perf_counter() - start
+            log.info(f"Shard {index}: {n_positions} positions. Total:"
+                     f" {played} games, {positions} positions,"
+                     f" {positions / elapsed:.1f} positions/s")
+    return positions
@@ -0,0 +1,194 @@
+import math
+
+from classes.patterns import get_patterns
+from classes.evaluation import distance, winning_cells
+
+# Exact solver of Hex positions by proof-number search. It proves
+# which player wins with perfect play, which is only practical with
+# few empty cells: on small boards, or at the end of the games.
+
+INFINITY = math.inf
+
+
+class PNode:
+    """
+    A node of the proof-number search tree. `proof` and `disproof` are
+    the numbers of leaves that still have to be solved to prove,
+    respectively disprove, that the prover wins from the node.
+    """
+    __slots__ = ("move", "proof", "disproof", "children", "parent", "key")
+
+    def __init__(self, move=None, parent=None, key=0):
+        self.move = move
+        self.proof = 1
+        self.disproof = 1
+        self.children = None
+        self.parent = parent
+        self.key = key
+
+
+class ProofNumberSolver:
+    """
+    Best-first proof-number search over a HexBoard.
+
+    Solved positions are cached by Zobrist key (with the player to
+    move) and kept from one call to the next, so that the positions
+    solved by a search are free to the following ones. Dead and
+    captured cells are never searched (cf. patterns.py): they are
+    never better than the other moves.
+    """
+    def __init__(self, max_nodes: int = 50_000, cache_size: int = 2 ** 20):
+        self.max_nodes = max_nodes
+        self.cache_size = cache_size
+        # Zobrist key -> winner
+        self.cache = {}
+        # Nodes created by the last search
+        self.nodes = 0
+
+    def solve(self, board, to_move: int) -> tuple:
+        """
+        Searches until the position is solved or the node budget runs
+        out. board is played on and given back as it was.
+
+        @return   (winner, move): the winner with perfect play (None if
+                  unknown) and, if to_move wins, a winning move.
+        """
+        self.board = board
+        self.prover = to_move
+        self.patterns = get_patterns(board.board_size)
+        self.topology = self.patterns.topology
+        self.nodes = 0
+
+        root = PNode(key=board.hash(to_move))
+        known = self.cache.get(root.key)
+        if known is not None and known != to_move:
+            return known, None
+        self.expand(root, to_move)
+        self.update(root, to_move)
+
+        while root.proof and root.disproof and self.nodes < self.max_nodes:
+            node, player = self.select(root, to_move)
+            self.expand(node, player)
+            # Back to the root, updating the numbers on the way
+            while True:
+                self.update(node, player)
+                if node is root:
+                    break
+                self.board.undo()
+                node = node.parent
+                player = 3 - player
+
+        if root.proof == 0 and root.children:
+            move = next(c.move for c in root.children if c.proof == 0)
+            return to_move, move
+        if root.disproof == 0:
+            return 3 - to_move, None
+        return None, None
+
+    def select(self, root: PNode, to_move: int) -> tuple:
+        """
+        Walks down to the most proving node, playing its moves on the
+        board.
+
+        @return   (node, player to move at node)
+        """
+        node, player = root, to_move
+        while node.children:
+            if player == self.prover:
+                node = min(node.children, key=lambda c: c.proof)
+            else:
+                node = min(node.children, key=lambda c: c.disproof)
+            self.board.play(node.move, player)
+            player = 3 - player
+        return node, player
+
+    def expand(self, node: PNode, player: int) -> None:
+        """
+        Creates the children of node, player being the player to move,
+        and solves those that end the game or are in the cache.
+
+        When player can win at once, only the winning move is created.
+        When the opponent threatens to, the only child is the block, or
+        the node is lost if there are several threats.
+        """
+        board = self.board
+        n = board.board_size
+        topology = self.topology
+        cells = board.cells()
+        node.children = []
+
+        candidates = None
+        if distance(cells, player, topology) == 1:
+            candidates = winning_cells(cells, player, topology)[:1]
+        elif distance(cells, 3 - player, topology) == 1:
+            candidates = winning_cells(cells, 3 - player, topology)
+            if len(candidates) > 1:
+                self.set_winner(node, 3 - player)
+                return
+        if candidates is None:
+            candidates = self.patterns.candidates(cells)
+
+        for index in candidates:
+            move = divmod(index, n)
+            board.play(move, player)
+            child = PNode(move, node, board.hash(3 - player))
+            winner = board.winner(player)
+            if winner is None:
+                winner = self.cache.get(child.key)
+            if winner is not None:
+                self.set_winner(child, winner)
+            else:
+                # The fewer stones a player needs, the easier its win
+                # is to prove
+                cells = board.cells()
+                child.proof = distance(cells, self.prover, topology)
+                child.disproof = distance(cells, 3 - self.prover, topology)
+            board.undo()
+            node.children.append(child)
+        self.nodes += len(node.children)
+
+    def set_winner(self, node: PNode, winner: int) -> None:
+        if winner == self.prover:
+            node.proof, node.disproof = 0, INFINITY
+        else:
+            node.proof, node.disproof = INFINITY, 0
+
+    def update(self, node: PNode, player: int) -> None:
+        """
+        Recomputes the numbers of node from its children, player being
+        the player to move at node. Solved nodes are cached, and their
+        subtree is dropped.
+        """
+        children = node.children
+        if not children:
+            # Solved when expanded
+            pass
+        elif player == self.prover:
+            node.proof = min(c.proof for c in children)
+            node.disproof = sum(c.disproof for c in children)
+        else:
+            node.proof = sum(c.proof for c in children)
+            node.disproof = min(c.disproof for c in children)
+
+        if node.proof == 0 or node.disproof == 0:
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            self.cache[node.key] = (
+                self.prover if node.proof == 0 else 3 - self.prover
+            )
+            if node.parent is not None:
+                node.children = []
+
+
+def solve(board_state, to_move: int, max_nodes: int = 50_000) -> tuple:
+    """
+    @return   (winner, move) of the board state (the `Game.logger`
+              representation), cf. ProofNumberSolver.solve.
+    """
+    from classes.board import BitBoard
+
+    board = BitBoard.from_array(board_state)
+    winner = board.winner()
+    if winner is not None:
+        return winner, None
+    return ProofNumberSolver(max_nodes).solve(board, to_move)
@@ -0,0 +1,120 @@
+import os
+import logging
+import cProfile
+
+import classes.logic as logic
+
+# Instrumentation of the games: counters filled by the strategies during
+# their search, and hooks called by `Game` that can be plugged in to
+# observe the games (see `Instrument`).
+
+
+class SearchStats:
+    """
+    Counters of the work done by a strategy for one move. Each strategy
+    owns one (`PlayerStrat.stats`), reset when a search starts.
+    Counters are plain integer attributes, so incrementing one costs
+    about as much as incrementing a local variable. depth_nodes holds
+    the nodes searched by each iteration of an iterative deepening.
+    """
+    FIELDS = ("nodes", "tt_hits", "tt_misses", "cutoffs", "win_checks",
+              "rollouts", "book_hits", "depth_nodes")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.nodes = 0
+        self.tt_hits = 0
+        self.tt_misses = 0
+        self.cutoffs = 0
+        self.win_checks = 0
+        self.rollouts = 0
+        self.book_hits = 0
+        self.depth_nodes = []
+
+    def as_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+def total_stats(moves: list, player: int) -> dict:
+    """
+    @return   The sum of the counters of the moves of player, given the
+              (player, think time, counters) of each move. Lists are
+              summed element-wise.
+    """
+    totals = {field: 0 for field in SearchStats.FIELDS}
+    totals["depth_nodes"] = []
+    for (p, _, stats) in moves:
+        if p != player:
+            continue
+        for field, value in stats.items():
+            if isinstance(value, list):
+                total = totals[field]
+                total.extend([0] * (len(value) - len(total)))
+                for i, count in enumerate(value):
+                    total[i] += count
+            else:
+                totals[field] += value
+    return totals
+
+
+class Instrument:
+    """
+    Hooks called by the game. Instruments are given to `Game` and do
+    nothing by default: a game without any instrument pays nothing for
+    this mechanism.
+    """
+    def on_game_start(self, game) -> None:
+        pass
+
+    def on_move(self, game, player: int, node: tuple, think_time,
+                stats: dict) -> None:
+        """
+        Called after each move with the think time (None for humans)
+        and the search counters of the move.
+        """
+        pass
+
+    def on_game_end(self, game) -> None:
+        pass
+
+
+class StatsLogger(Instrument):
+    """
+    Logs the search counters and think time of each player at the end
+    of each game.
+    """
+    def on_game_end(self, game) -> None:
+        log = logging.getLogger("rich")
+        for player in (logic.BLACK_PLAYER, logic.WHITE_PLAYER):
+            think_time = sum(
+                t or 0. for (p, t, _) in game.moves if p == player)
+            counters = total_stats(game.moves, player)
+            log.info(
+                f"Game {game.game_id}, {logic.player2str[player]}"
+                f" ({game.strategies[player]}): {think_time:.3f}s, "
+                + ", ".join(f"{k} {v}" for k, v in counters.items())
+            )
+
+
+class Profiler(Instrument):
+    """
+    Runs cProfile over each game and dumps its statistics to
+    `directory/game_<game id>.prof` (to be read with pstats or
+    snakeviz).
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.profile = None
+
+    def on_game_start(self, game) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def on_game_end(self, game) -> None:
+        self.profile.disable()
+        self.profile.dump_stats(
+            os.path.join(self.directory, f"game_{game.game_id}.prof"))
+        self.profile = None
@@ -1,25 +1,46 @@
+import os
 import copy
 import math
 import random
-from math import log, sqrt, inf
-from random import randrange
+import weakref
+import multiprocessing
+from math import log, sqrt
 import numpy as np
-from rich.table import Table
-from rich.progress import track
-from rich.console import Console
-from rich.progress import Progress
 import time
 
 import classes.logic as logic
+from classes.board import backends, BitBoard
+from classes.rollout import batch_playouts, move_winrates
+from classes.transposition import TranspositionTable, EXACT, LOWER, UPPER
+from classes.stats import SearchStats
+from classes.evaluation import Evaluator
+from classes.patterns import PatternEngine, get_patterns
+from classes.solver import ProofNumberSolver
+from classes.book import OpeningBook
+from classes.symmetry import SymmetricKeys, get_symmetry, IDENTITY
+from classes.network import NetworkEvaluator, get_network
 
 # When implementing a new strategy add it to the `str2strat`
 # dictionary at the end of the file
 
 
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its time or node budget is exhausted.
+    """
+
+
 class PlayerStrat:
-    def __init__(self, _board_state, player):
+    def __init__(self, _board_state, player, **options):
+        """
+        Options that a strategy does not know about are ignored, so that
+        the same command line options can be given to every player.
+        """
         self.root_state = _board_state
         self.player = player
+        self.options = options
+        # Counters of the last call to start, which resets them
+        self.stats = SearchStats()
 
     def start(self):
         """
@@ -30,23 +51,55 @@ class PlayerStrat:
         """
         raise NotImplementedError
 
+    def notify_move(self, node, player):
+        """
+        Called by the game after each move, of either player, so that
+        the strategy can update its state instead of rebuilding it
+        at its next turn.
+        """
+        pass
+
+    def visit_counts(self):
+        """
+        @returns    {move: visits} of the moves searched by the last call
+                    to start, for the strategies that count them (e.g.
+                    MCTS), None for the others.
+        """
+        return None
+
+    def reset(self, _board_state):
+        """
+        Called before each new game when the strategy is kept from one
+        game to the next (cf. Tournament). What only holds for the
+        previous game must be dropped here; other caches can be kept.
+        """
+        self.root_state = _board_state
+
 class Node(object):
     """
     This class implements the main object that you will manipulate : nodes.
     Nodes include the state of the game (i.e. the 2D board), children (i.e. other children nodes), a list of
     untried moves, etc...
     """
-    def __init__(self, board, player=None, move=(None, None),
+    def __init__(self, board=None, player=None, move=(None, None),
                  wins=0, visits=0, children=None):
-        # Save the #wins:#visited ratio
-        self.state = copy.deepcopy(board)
+        # Without a board, the node only stores statistics and the
+        # untried moves are filled in by the search (None until then)
+        self.state = copy.deepcopy(board) if board is not None else None
         self.player = player
         self.move = move
+        # Save the #wins:#visited ratio
         self.wins = wins
         self.visits = visits
         self.children = children or []
         self.parent = None
-        self.untried_moves = logic.get_possible_moves(board)
+        self.untried_moves = (
+            logic.get_possible_moves(board) if board is not None else None
+        )
+        # Probability of the move, and of each untried move, given by
+        # a policy network if any
+        self.prior = None
+        self.move_priors = None
 
     def add_child(self, child):
         child.parent = self
@@ -55,236 +108,1099 @@ class Node(object):
 
 class Random(PlayerStrat):
     # Build here the class for a random player
+    def __init__(self, _board_state, player, seed=None, **options):
+        super().__init__(_board_state, player, **options)
+        self.rng = random.Random(seed)
+
     def start(self):
         # Get all possible moves
         possible_moves = logic.get_possible_moves(self.root_state)
         # Select a random move
-        move = random.choice(possible_moves)
+        move = self.rng.choice(possible_moves)
         return move
     
 
 class MiniMax(PlayerStrat):
     # Build here the class implementing the MiniMax strategy
-    def __init__(self, _board_state, player):
-        super().__init__(_board_state, player)
+
+    # Score of a won game (see utility)
+    WIN = 200
+    # Width of the windows of the principal variation search
+    NULL_WINDOW = 1e-3
+    # Moves of a node searched before the late move reductions
+    LMR_MOVES = 3
+
+    def __init__(self, _board_state, player, backend="bitboard",
+                 tt_size=16, depth=4, move_time=None, max_nodes=None,
+                 ordering=True, pvs=False, lmr=False, patterns=False,
+                 symmetry=False, **options):
+        super().__init__(_board_state, player, **options)
+        # Board representation used during the search (cf. board.py),
+        # kept up to date by notify_move
+        self.backend = backends[backend]
+        # Pattern engine (cf. patterns.py) kept in sync with the board,
+        # to skip the dead and captured cells
+        self.use_patterns = patterns
+        self.patterns = None
+        # Keys of the symmetric positions (cf. symmetry.py) kept in
+        # sync with the board, so that they share their entries of the
+        # transposition table and of the evaluation cache
+        self.use_symmetry = symmetry
+        self.symmetric_keys = None
+        self.set_board(_board_state)
+        # Transposition table of tt_size MB (0 disables it), kept
+        # from one move, and one game, to the next
+        self.tt = TranspositionTable(tt_size) if tt_size else None
+        # Search budget: without any, the search stops at self.depth
+        self.depth = depth
+        self.move_time = move_time
+        self.max_nodes = max_nodes
+        # Move ordering: cutoffs per cell of each player (kept from
+        # one move to the next), killer moves per depth, and a prior
+        # preferring the center
+        self.ordering = ordering
+        self.pvs = pvs
+        self.lmr = lmr
+        self.topology = logic.get_topology(self.board.board_size)
+        self.symmetry = get_symmetry(self.board.board_size)
+        n_cells = self.topology.n_cells
+        self.history = {logic.BLACK_PLAYER: [0] * n_cells,
+                        logic.WHITE_PLAYER: [0] * n_cells}
+        self.killers = {}
+        self.prior = [-d / self.board.board_size
+                      for d in self.topology.center_distance]
 
     def start(self):
-        
-        best_move = None
-        best_score = -inf
-        
-        self.root_node = Node(self.root_state, player = self.player)
-        #self.kernel = self.gkern(len(self.root_node.state), 1)
-        # print(self.kernel)
-        temp = time.time()
-        score, move = self.minmax(4)
-        # print("time: ", time.time() - temp)
-        # print("score: ", score)
-        
-        best_move = move
-        best_score = score
-        
-        return best_move
-    
+        self.new_search()
+        return self.iterative_deepening(self.max_depth())
+
+    def max_depth(self):
+        """
+        @return the depth at which the search stops, if it has time.
+        """
+        if self.move_time is None and self.max_nodes is None:
+            return self.depth
+        # With a budget, deepen until the end of the game
+        return len(self.board.moves())
+
+    def iterative_deepening(self, max_depth):
+        """
+        @return the move to play
+
+        Searches at depth 1, 2, ... max_depth, until the time or node
+        budget runs out. The best move of an iteration is searched
+        first by the next one, so that an interrupted iteration still
+        gives a move at least as good as the previous one.
+        """
+        self.deadline = None
+        if self.move_time is not None:
+            self.deadline = time.monotonic() + self.move_time
+
+        self.best_move = None
+        stones = self.board.count()
+        for depth in range(1, max_depth + 1):
+            self.root_best = None
+            nodes = self.stats.nodes
+            try:
+                score, move = self.minmax(depth)
+            except SearchTimeout:
+                # Take back the moves of the interrupted search
+                while self.board.count() > stones:
+                    self.undo()
+                if self.root_best is not None:
+                    self.best_move = self.root_best
+                break
+            self.best_move = move
+            self.stats.depth_nodes.append(self.stats.nodes - nodes)
+            if abs(score) > self.WIN / 2:
+                # The game is solved
+                break
+
+        if self.best_move is None:
+            self.best_move = self.board.moves()[0]
+        return self.best_move
+
+    def count_node(self):
+        """
+        Counts a searched node, raises SearchTimeout once the budget is
+        exhausted.
+        """
+        stats = self.stats
+        stats.nodes += 1
+        if self.max_nodes is not None and stats.nodes > self.max_nodes:
+            raise SearchTimeout
+        # Reading the clock is cheap, but not free
+        if (self.deadline is not None and not stats.nodes & 63
+                and time.monotonic() > self.deadline):
+            raise SearchTimeout
+
+    def notify_move(self, node, player):
+        self.play(node, player)
+
+    def reset(self, _board_state):
+        super().reset(_board_state)
+        self.set_board(_board_state)
+
+    def set_board(self, board_state):
+        """
+        Rebuilds the search board, and the pattern engine and symmetric
+        keys if any, from board_state.
+        """
+        self.board = self.backend.from_array(board_state)
+        if self.use_patterns:
+            self.patterns = PatternEngine.from_board(self.board)
+        if self.use_symmetry:
+            self.symmetric_keys = SymmetricKeys.from_board(self.board)
+
+    def play(self, move, player):
+        """
+        Plays move on the search board, the pattern engine and the
+        symmetric keys.
+        """
+        self.board.play(move, player)
+        if self.patterns is not None or self.symmetric_keys is not None:
+            (x, y) = move
+            index = int(x * self.board.board_size + y)
+            if self.patterns is not None:
+                self.patterns.play(index, player)
+            if self.symmetric_keys is not None:
+                self.symmetric_keys.play(index, player)
+
+    def undo(self):
+        self.board.undo()
+        if self.patterns is not None:
+            self.patterns.undo()
+        if self.symmetric_keys is not None:
+            self.symmetric_keys.undo()
+
+    def position_key(self, player):
+        """
+        @return (key, transform): the key of the position, player to
+                move, in the transposition table, and the symmetry
+                mapping the position to the one stored under that key
+                (the canonical one, with symmetry)
+        """
+        if self.symmetric_keys is None:
+            return self.board.hash(player), IDENTITY
+        return self.symmetric_keys.canonical(player)
+
+    def moves(self, player):
+        """
+        @return (moves, forced): the moves to search, without the dead
+                and captured cells when patterns are used, and the
+                moves saving the bridges and edge templates of player
+                the last stone intruded into
+        """
+        if self.patterns is None:
+            return self.board.moves(), []
+        n = self.board.board_size
+        moves = [divmod(i, n) for i in self.patterns.candidates()]
+        forced = []
+        for last in self.board.recent(1):
+            forced = [divmod(i, n)
+                      for i in self.patterns.responses(player, last)]
+        return moves, forced
+
+    def new_search(self):
+        """
+        Prepares the board and the transposition table for a search
+        from the current state of the game.
+        """
+        self.stats.reset()
+        if self.board.count() != np.count_nonzero(self.root_state):
+            # Moves were played without notify_move
+            self.set_board(self.root_state)
+        if self.tt is not None:
+            self.tt.new_search()
+        self.killers = {}
+        for scores in self.history.values():
+            # Older cutoffs matter less
+            scores[:] = [score // 2 for score in scores]
+
     def minmax(self, depth = math.inf):
         """
         @return the score of the board state for the player and the move to play
-        Minmax algorithm
+        Minmax algorithm with alpha-beta pruning.
+
+        Moves are played on self.board and undone on the way back up,
+        so that only the current path is kept in memory. Both players
+        share the transposition table, if any.
+
+        Moves are searched in the order of order_moves. With self.pvs,
+        the moves after the first one are searched with a null window,
+        and again with the full window only if they may be better.
+        With self.lmr, the late moves of deep enough nodes are searched
+        one ply shallower first.
         """
-        def max_value(node, depth, inner_depth, alpha, beta):
+        def max_value(inner_depth, remaining, alpha, beta):
             """
             @return the score of the board state for the player and the move to play
             """
             player = self.player
-            if (inner_depth >= depth ) or (logic.is_game_over(3 - player, node.state) is not None):
-                value = self.utility(node)
-                return value, node.move
+            self.count_node()
+            self.stats.win_checks += 1
+            if (self.board.winner(3 - player) is not None):
+                return self.utility(3 - player, inner_depth), None
+            if remaining <= 0:
+                return self.eval(player), None
+
+            key = self.position_key(player)
+            window = (alpha, beta)
+            cut, alpha, beta, actions = self.probe(
+                key, player, remaining, inner_depth, alpha, beta)
+            if cut is not None:
+                self.stats.cutoffs += 1
+                return cut
 
-            
             value = -np.inf
-            action = None 
-            actions = logic.get_possible_moves(node.state)
-            for a in actions:
-                x, y = a
-                nextNode = Node(node.state, player = player, move = a)
-                nextNode.state[x][y] = player
-                nextNode.parent = node
-                node.add_child(nextNode)
-
-                v2, a2 = min_value(nextNode, depth, inner_depth+1, alpha, beta)
-                
+            action = None
+            for i, a in enumerate(actions):
+                self.play(a, player)
+                reduction = self.reduction(i, remaining)
+                if i == 0 or not (self.pvs or reduction):
+                    v2, _ = min_value(inner_depth+1, remaining-1, alpha, beta)
+                else:
+                    # Is the move better than alpha?
+                    null_beta = alpha + self.NULL_WINDOW if self.pvs else beta
+                    v2, _ = min_value(inner_depth+1, remaining-1-reduction,
+                                      alpha, null_beta)
+                    if v2 > alpha and (reduction or v2 < beta):
+                        v2, _ = min_value(inner_depth+1, remaining-1,
+                                          alpha, beta)
+                self.undo()
+
                 if v2 > value:
-                    value = v2 
-                    action = a2
+                    value = v2
+                    action = a
                     alpha = max(alpha, v2)
+                    if inner_depth == 0:
+                        self.root_best = a
                 if value >= beta:
-                    return value, action
-                               
+                    self.stats.cutoffs += 1
+                    self.reward(a, player, inner_depth, remaining)
+                    break
+
+            self.store(key, remaining, inner_depth, value, window, action)
             return value, action
 
-        def min_value(node, depth, inner_depth, alpha, beta):
+        def min_value(inner_depth, remaining, alpha, beta):
             """
             @return the score of the board state for the player and the move to play
             """
             player = 3 - self.player
-            if (inner_depth >= depth ) or (logic.is_game_over(3 - player, node.state) is not None):
-                value = self.utility(node)
-                return value, node.move
-            
+            self.count_node()
+            self.stats.win_checks += 1
+            if (self.board.winner(3 - player) is not None):
+                return self.utility(3 - player, inner_depth), None
+            if remaining <= 0:
+                return self.eval(player), None
+
+            key = self.position_key(player)
+            window = (alpha, beta)
+            cut, alpha, beta, actions = self.probe(
+                key, player, remaining, inner_depth, alpha, beta)
+            if cut is not None:
+                self.stats.cutoffs += 1
+                return cut
+
             value = np.inf
-            action = None 
-            actions = logic.get_possible_moves(node.state)
-            for a in actions:
-                x, y = a
-                nextNode = Node(node.state, player = player, move = a)
-                nextNode.state[x][y] = player
-                nextNode.parent = node
-                node.add_child(nextNode)
-                
-                v2, a2 = max_value(nextNode, depth, inner_depth+1, alpha, beta)
-               
+            action = None
+            for i, a in enumerate(actions):
+                self.play(a, player)
+                reduction = self.reduction(i, remaining)
+                if i == 0 or not (self.pvs or reduction):
+                    v2, _ = max_value(inner_depth+1, remaining-1, alpha, beta)
+                else:
+                    # Is the move better than beta (for the opponent)?
+                    null_alpha = beta - self.NULL_WINDOW if self.pvs else alpha
+                    v2, _ = max_value(inner_depth+1, remaining-1-reduction,
+                                      null_alpha, beta)
+                    if v2 < beta and (reduction or v2 > alpha):
+                        v2, _ = max_value(inner_depth+1, remaining-1,
+                                          alpha, beta)
+                self.undo()
+
                 if v2 < value :
-                    value = v2 
-                    action = a2
+                    value = v2
+                    action = a
                     beta = min(beta, value)
                 if value <= alpha:
-                    return value, action
+                    self.stats.cutoffs += 1
+                    self.reward(a, player, inner_depth, remaining)
+                    break
 
+            self.store(key, remaining, inner_depth, value, window, action)
             return value, action
 
-        return max_value(self.root_node, depth, 0, -np.inf, np.inf)
-        
-    def utility(self, node):
+        return max_value(0, depth, -np.inf, np.inf)
+
+    def reduction(self, i, remaining):
         """
-        @return the score of the board state for the player and the move to play
+        @return the number of plies the i-th move of a node is reduced
+                by (late move reductions)
+        """
+        if self.lmr and i >= self.LMR_MOVES and remaining >= 3:
+            return 1
+        return 0
+
+    def reward(self, move, player, inner_depth, remaining):
+        """
+        Records move as having caused a cutoff: it becomes a killer
+        move of inner_depth and its history score grows.
+        """
+        if not self.ordering:
+            return
+        killers = self.killers.setdefault(inner_depth, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        (x, y) = move
+        self.history[player][x * self.board.board_size + y] += remaining * remaining
+
+    def order_moves(self, moves, player, inner_depth, first):
+        """
+        @return moves sorted by their chances to cause a cutoff: the
+                moves of first (best moves of the previous iteration
+                and of the transposition table), the killer moves of
+                inner_depth, then by history score, with a prior for
+                central moves and moves near the last stones.
+        """
+        if not self.ordering:
+            for move in reversed(first):
+                if move in moves:
+                    moves.remove(move)
+                    moves.insert(0, move)
+            return moves
+
+        n = self.board.board_size
+        topology = self.topology
+        score = [h + p for (h, p) in zip(self.history[player], self.prior)]
+        for index in self.board.recent(2):
+            for neighbour in topology.adjacency[index]:
+                score[neighbour] += 1.
+            for bridge in topology.bridges[index]:
+                score[bridge] += 2.
+        for rank, move in enumerate(self.killers.get(inner_depth, ())):
+            (x, y) = move
+            score[x * n + y] += 1e8 - rank
+        for rank, move in enumerate(first):
+            if move is not None:
+                (x, y) = move
+                score[x * n + y] += 1e10 - rank
+        return sorted(moves, key=lambda move: -score[move[0] * n + move[1]])
+
+    def probe(self, key, player, remaining, inner_depth, alpha, beta):
+        """
+        Looks the position up in the transposition table, key being the
+        (key, transform) of position_key.
+
+        @return (cut, alpha, beta, moves): cut is the (score, move) to
+                return if the stored bound is enough to conclude,
+                otherwise None. alpha and beta are narrowed by the
+                stored bound, and moves are ordered by order_moves,
+                the stored best move first.
+        """
+        moves, forced = self.moves(player)
+        first = []
+        if inner_depth == 0:
+            # Best move of the previous iteration
+            first.append(self.best_move)
+        if self.tt is None:
+            return None, alpha, beta, self.order_moves(
+                moves, player, inner_depth, first + forced)
+        key, transform = key
+        entry = self.tt.probe(key)
+        if entry is None:
+            self.stats.tt_misses += 1
+            return None, alpha, beta, self.order_moves(
+                moves, player, inner_depth, first + forced)
+        self.stats.tt_hits += 1
+
+        stored_depth, flag, value, index = entry
+        flag, value = self.transform_bound(transform, flag, value)
+        value = self.from_tt(value, inner_depth)
+        move = None
+        if index >= 0:
+            move = divmod(self.symmetry.cell(index, transform),
+                          self.board.board_size)
+            first.append(move)
+        first.extend(forced)
+
+        # The root must search its moves to return one
+        if inner_depth > 0 and stored_depth >= remaining:
+            if flag == EXACT:
+                return (value, move), alpha, beta, moves
+            if flag == LOWER:
+                alpha = max(alpha, value)
+            elif flag == UPPER:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return (value, move), alpha, beta, moves
+        return None, alpha, beta, self.order_moves(
+            moves, player, inner_depth, first)
+
+    def store(self, key, remaining, inner_depth, value, window, move):
+        """
+        Saves the result of the search of a node, searched within the
+        (alpha, beta) window, in the transposition table, key being the
+        (key, transform) of position_key.
+        """
+        if self.tt is None:
+            return
+        key, transform = key
+        alpha, beta = window
+        if value <= alpha:
+            flag = UPPER
+        elif value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        index = -1
+        if move is not None:
+            (x, y) = move
+            index = self.symmetry.cell(
+                int(x * self.board.board_size + y), transform)
+        flag, value = self.transform_bound(
+            transform, flag, self.to_tt(value, inner_depth))
+        self.tt.store(key, remaining, flag, value, index)
+
+    def transform_bound(self, transform, flag, value):
+        """
+        @return the (flag, value) of a search result seen from the
+                image of the position by transform: the colours are
+                swapped by some symmetries, which negates the value
+                (a lower bound becoming an upper one). Its own inverse.
+        """
+        if not self.symmetry.swaps[transform]:
+            return flag, value
+        return {EXACT: EXACT, LOWER: UPPER, UPPER: LOWER}[flag], -value
+
+    def to_tt(self, value, inner_depth):
+        """
+        @return value with win scores made relative to the node (and
+                not to the root), as they are stored in the table
+        """
+        if value > self.WIN / 2:
+            return value + inner_depth
+        if value < -self.WIN / 2:
+            return value - inner_depth
+        return value
+
+    def from_tt(self, value, inner_depth):
         """
-        res = logic.is_game_over(node.player, node.state)
-        if res != self.player: # logique inversée
-            return 200
+        @return the inverse of to_tt
+        """
+        if value > self.WIN / 2:
+            return value - inner_depth
+        if value < -self.WIN / 2:
+            return value + inner_depth
+        return value
+
+    def utility(self, winner, inner_depth):
+        """
+        @return the score of a finished game for the player: quicker
+                wins (and slower losses) are preferred
+        """
+        if winner == self.player:
+            return self.WIN - inner_depth
         else :
-            return -200
+            return inner_depth - self.WIN
+
+    def eval(self, curr_player):
+        """
+        @return the score of an unfinished board state for the player
+        """
+        return 0
 
 class ABheur(MiniMax):
+    """
+    MiniMax cut at a shallow depth, whose leaves are scored by the
+    connection distance or resistance of each player (cf.
+    evaluation.py), or by the value of the network saved in the
+    network directory (cf. network.py) with the "network" evaluation.
+    The network evaluates the children of the nodes one ply above the
+    leaves in batches.
+    """
+    def __init__(self, _board_state, player, evaluation="distance",
+                 network=None, **options):
+        super().__init__(_board_state, player, **options)
+        # Kept from one move to the next, like the transposition table
+        if evaluation == "network":
+            self.evaluator = NetworkEvaluator(get_network(network),
+                                              self.board.board_size)
+        else:
+            self.evaluator = Evaluator(self.board.board_size, evaluation)
+        self.batch_leaves = evaluation == "network"
 
     def start(self):
-    
-        best_move = None
-        best_score = -inf
-        
-        self.root_node = Node(self.root_state, player = self.player)
-        self.kernel = self.gkern(len(self.root_node.state), 1)
-        # print(self.kernel)
-        temp = time.time()
-        score, move = self.minmax()
-        # print("time: ", time.time() - temp)
-        # print("score: ", score)
-        
-        best_move = move
-        best_score = score
-        
-        return best_move
-
-    def minmax(self):
+        self.new_search()
+        return self.iterative_deepening(self.max_depth())
+
+    def max_depth(self):
+        if self.move_time is None and self.max_nodes is None:
+            return int(np.sqrt(self.board.count() + 1))
+        return super().max_depth()
+
+    def eval(self, curr_player):
         """
-        @return the score of the board state for the player and the move to play
-        Minmax algorithm
+        @return the score of the board state for the player
         """
-        
-        depth = int(np.sqrt(len(self.root_node.state[np.where(self.root_node.state != 0)]) + 1))
-        # print("DEPTH : ",  depth)
-        
+        return self.evaluator.score(self.board, self.player,
+                                    self.symmetric_keys, curr_player)
 
-        def max_value(node, depth, inner_depth, alpha, beta):
-            """
-            @return the score of the board state for the player and the move to play
-            """
-            player = self.player
-            if (logic.is_game_over(3 - player, node.state) is not None):
-                value = self.utility(node)
-                return value, node.move
-            if inner_depth >= depth :
-                value = self.eval(node, player)
-                return value, node.move
-            
-            value = -np.inf
-            action = None 
-            actions = logic.get_possible_moves(node.state)
-            for a in actions:
-                x, y = a
-                nextNode = Node(node.state, player = player, move = a)
-                nextNode.state[x][y] = player
-                nextNode.parent = node
-                node.add_child(nextNode)
-
-                v2, a2 = min_value(nextNode, depth, inner_depth+1, alpha, beta)
-                
-                if v2 > value:
-                    value = v2 
-                    action = a2
-                    alpha = max(alpha, v2)
-                if value >= beta:
-                    return value, action
-                            
-            return value, action
+    def probe(self, key, player, remaining, inner_depth, alpha, beta):
+        cut, alpha, beta, moves = super().probe(
+            key, player, remaining, inner_depth, alpha, beta)
+        if cut is None and remaining == 1 and self.batch_leaves:
+            self.evaluator.prefetch(self.board, player, moves,
+                                    self.symmetric_keys)
+        return cut, alpha, beta, moves
 
-        def min_value(node, depth, inner_depth, alpha, beta):
-            """
-            @return the score of the board state for the player and the move to play
-            """
-            player = 3 - self.player
-            if (logic.is_game_over(3 - player, node.state) is not None):
-                value = self.utility(node)
-                return value, node.move
-            if inner_depth >= depth :
-                value = self.eval(node, player)
-                return value, node.move
-            
-            
-            value = np.inf
-            action = None 
-            actions = logic.get_possible_moves(node.state)
-            for a in actions:
-                x, y = a
-                nextNode = Node(node.state, player = player, move = a)
-                nextNode.state[x][y] = player
-                nextNode.parent = node
-                node.add_child(nextNode)
-                
-                v2, a2 = max_value(nextNode, depth, inner_depth+1, alpha, beta)
-            
-                if v2 < value :
-                    value = v2 
-                    action = a2
-                    beta = min(beta, value)
-                if value <= alpha:
-                    return value, action
+class MCTS(PlayerStrat):
+    """
+    Monte Carlo Tree Search with the UCT selection rule.
 
-            return value, action
+    Nodes only hold statistics: the moves of the selected path are
+    played on a single board and taken back after each playout. The
+    `player` of a node is the one who played its `move`, and `wins`
+    counts the playouts won by this player.
+
+    The tree is kept between turns: notify_move moves its root down
+    to the position reached after each move.
+
+    With rollout_batch > 1, each new leaf is evaluated by that many
+    playouts at once, with NumPy (cf. rollout.py).
+
+    With a network (the directory of its weights, cf. network.py), its
+    policy gives the priors of the moves and the selection rule is
+    PUCT: the moves are expanded in the order of their priors, and an
+    unexplored move is expanded only when its prior makes it better
+    than the children already explored.
+    """
+    def __init__(self, _board_state, player, backend="bitboard",
+                 exploration=math.sqrt(2), playouts=1000, move_time=None,
+                 rollout_batch=1, seed=None, patterns=False, network=None,
+                 **options):
+        super().__init__(_board_state, player, **options)
+        self.backend = backends[backend]
+        self.network_path = network
+        self.network = get_network(network) if network else None
+        # Leaves out the dead and captured cells of the tree
+        self.patterns = patterns
+        self.exploration = exploration
+        # Budget: number of playouts, and time if move_time is given
+        self.playouts = playouts
+        self.move_time = move_time
+        self.rollout_batch = rollout_batch
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+
+        self.board = self.backend.from_array(_board_state)
+        self.root = None
+        # Visits of the moves at the end of the last search
+        self.root_visits = None
+
+    def start(self):
+        self.stats.reset()
+        if self.board.count() != np.count_nonzero(self.root_state):
+            # Moves were played without notify_move
+            self.board = self.backend.from_array(self.root_state)
+            self.root = None
+        if self.root is None:
+            self.root = self.new_root()
+        self.search()
+        self.root_visits = {
+            child.move: child.visits for child in self.root.children
+        }
+
+        child = max(self.root.children, key=lambda c: c.visits)
+        return child.move
+
+    def notify_move(self, node, player):
+        self.board.play(node, player)
+        if self.root is not None:
+            # Keep the subtree of the move, if it was explored
+            self.root = next((
+                child for child in self.root.children
+                if child.move == tuple(node) and child.player == player
+            ), None)
+            if self.root is not None:
+                self.root.parent = None
+
+    def reset(self, _board_state):
+        super().reset(_board_state)
+        self.board = self.backend.from_array(_board_state)
+        self.root = None
+
+    def visit_counts(self):
+        return self.root_visits
 
-        return max_value(self.root_node, depth, 0, -np.inf, np.inf)
-        
-    def eval(self, node, curr_player):
+    def new_root(self):
         """
-        @return the score of the board state for the player and the move to play
+        @return a root for the current position, our turn to play
+        """
+        root = Node(player=3 - self.player)
+        self.set_moves(root)
+        return root
+
+    def set_moves(self, node):
+        """
+        Fills in the untried moves of node, whose position is on the
+        board, with their priors if there is a network: the moves are
+        then sorted by increasing prior.
+        """
+        node.untried_moves = self.candidate_moves()
+        if self.network is None or not node.untried_moves:
+            return
+        n = self.board.board_size
+        policy, _ = self.network.evaluate([self.board.cells()],
+                                          [3 - node.player])
+        node.move_priors = {
+            move: float(policy[0, move[0] * n + move[1]])
+            for move in node.untried_moves
+        }
+        node.untried_moves.sort(key=node.move_priors.get)
+
+    def candidate_moves(self):
+        """
+        @return the moves of the current position, without its dead and
+                captured cells if patterns are used
+        """
+        if not self.patterns:
+            return self.board.moves()
+        n = self.board.board_size
+        cells = get_patterns(n).candidates(self.board.cells())
+        return [divmod(i, n) for i in cells]
+
+    def search(self):
+        deadline = None
+        if self.move_time is not None:
+            deadline = time.monotonic() + self.move_time
+        done = 0
+        # At least one, for the root to have a child to play
+        while done < max(1, self.playouts):
+            done += self.iteration()
+            self.stats.nodes += 1
+            if deadline is not None and time.monotonic() > deadline:
+                break
+
+    def iteration(self):
+        """
+        Selection, expansion, playout and backpropagation.
+
+        @return the number of playouts done
+        """
+        stones = self.board.count()
+        node = self.descend()
+        playouts = self.rollout_batch
+
+        # Playout
+        if self.is_terminal(node):
+            black_wins = playouts * (node.player == logic.BLACK_PLAYER)
+        elif playouts == 1:
+            winner = self.board.playout(3 - node.player, self.rng)
+            black_wins = int(winner == logic.BLACK_PLAYER)
+        else:
+            winners = batch_playouts(self.board.to_array(), 3 - node.player,
+                                     playouts, self.np_rng)
+            black_wins = int(np.sum(winners == logic.BLACK_PLAYER))
+
+        self.backpropagate(node, playouts, black_wins)
+        self.stats.rollouts += playouts
+
+        while self.board.count() > stones:
+            self.board.undo()
+        return playouts
+
+    def descend(self):
+        """
+        Selection and expansion: plays the moves from the root to a
+        new node on self.board.
+
+        @return the node reached
+        """
+        node = self.root
+        while node.untried_moves or node.children:
+            if node.untried_moves and (self.network is None
+                                       or self.expand_first(node)):
+                return self.expand(node)
+            node = self.select(node)
+            self.board.play(node.move, node.player)
+        return node
+
+    @staticmethod
+    def is_terminal(node):
+        """
+        @return True iff there is nothing to expand: the game is over.
         """
-        temp = node.state
-        temp[np.where(temp == curr_player)] = -1
-        score_board = np.sum(temp * self.kernel)
-        return score_board
+        return not node.untried_moves and not node.children
 
-    def gkern(self, l=5, sig=1.):
+    @staticmethod
+    def backpropagate(node, playouts, black_wins):
         """
-        creates gaussian kernel with side length `l` and a sigma of `sig`
+        Adds the results of playouts from node to it and its ancestors.
         """
-        ax = np.linspace(-(l - 1) / 2., (l - 1) / 2., l)
-        gauss = np.exp(-0.5 * np.square(ax) / np.square(sig))
-        kernel = np.outer(gauss, gauss)
-        return kernel / np.sum(kernel)
+        while node is not None:
+            node.visits += playouts
+            if node.player == logic.BLACK_PLAYER:
+                node.wins += black_wins
+            else:
+                node.wins += playouts - black_wins
+            node = node.parent
+
+    def select(self, node):
+        """
+        @return the child maximising the UCT value (PUCT with a network)
+        """
+        if self.network is not None:
+            sqrt_visits = sqrt(node.visits)
+            return max(node.children,
+                       key=lambda child: self.puct(child, sqrt_visits))
+        log_visits = log(node.visits)
+        c = self.exploration
+        return max(
+            node.children,
+            key=lambda child: child.wins / child.visits
+                + c * sqrt(log_visits / child.visits)
+        )
+
+    def puct(self, child, sqrt_visits):
+        """
+        @return the PUCT value of child, given the square root of the
+                visits of its parent
+        """
+        return (child.wins / child.visits + self.exploration * child.prior
+                * sqrt_visits / (1 + child.visits))
+
+    def expand_first(self, node):
+        """
+        @return True iff the PUCT value of the untried move of node with
+                the highest prior beats those of its children. The
+                value of an untried move is taken to be that of node
+                for the player to move.
+        """
+        if not node.children:
+            return True
+        sqrt_visits = sqrt(node.visits)
+        value = 1 - node.wins / node.visits
+        prior = node.move_priors[node.untried_moves[-1]]
+        unexplored = value + self.exploration * prior * sqrt_visits
+        return unexplored >= max(self.puct(child, sqrt_visits)
+                                 for child in node.children)
+
+    def expand(self, node):
+        """
+        @return a new child of node, for one of its untried moves: the
+                one with the highest prior with a network, a random
+                one otherwise
+        """
+        moves = node.untried_moves
+        if self.network is None:
+            i = self.rng.randrange(len(moves))
+            moves[i], moves[-1] = moves[-1], moves[i]
+        move = moves.pop()
+
+        player = 3 - node.player
+        self.board.play(move, player)
+        child = Node(player=player, move=move)
+        if node.move_priors is not None:
+            child.prior = node.move_priors.pop(move)
+        self.stats.win_checks += 1
+        if self.board.winner(player) is None:
+            self.set_moves(child)
+        else:
+            child.untried_moves = []
+        node.add_child(child)
+        return child
+
+
+class MonteCarlo(PlayerStrat):
+    """
+    Flat Monte Carlo: plays the move that wins the most random
+    playouts, all of them being run at once with NumPy.
+    """
+    def __init__(self, _board_state, player, playouts=1000, seed=None,
+                 patterns=False, **options):
+        super().__init__(_board_state, player, **options)
+        # Playouts per move
+        self.playouts = playouts
+        # Leaves out the dead and captured cells
+        self.patterns = patterns
+        self.np_rng = np.random.default_rng(seed)
+
+    def start(self):
+        self.stats.reset()
+        moves = logic.get_possible_moves(self.root_state)
+        if self.patterns:
+            n = self.root_state.shape[0]
+            cells = self.root_state.reshape(-1).tolist()
+            moves = [divmod(i, n) for i in get_patterns(n).candidates(cells)]
+        n_moves = len(moves)
+        per_move = max(1, self.playouts // n_moves)
+        winrates = move_winrates(
+            self.root_state, self.player, per_move, self.np_rng, moves=moves
+        )
+        self.stats.nodes = n_moves
+        self.stats.rollouts = per_move * n_moves
+        self.stats.win_checks = per_move * n_moves
+        return max(winrates, key=winrates.get)
+
+
+def _root_search(args):
+    """
+    Root parallelism worker: builds its own MCTS tree.
+
+    @return the (move, visits, wins) of the children of the root
+    """
+    board_state, player, options, seed = args
+    strategy = MCTS(board_state, player, seed=seed, **options)
+    strategy.root = strategy.new_root()
+    strategy.search()
+    return [
+        (tuple(map(int, child.move)), child.visits, child.wins)
+        for child in strategy.root.children
+    ]
+
+
+def _leaf_playouts(args):
+    """
+    Leaf parallelism worker.
+
+    @return the number of playouts won by black from the given board
+    """
+    board_state, to_move, playouts, seed = args
+    winners = batch_playouts(board_state, to_move, playouts,
+                             np.random.default_rng(seed))
+    return int(np.sum(winners == logic.BLACK_PLAYER))
+
+
+class ParallelMCTS(MCTS):
+    """
+    MCTS spread over a pool of worker processes.
+
+    * "root" parallelism: each worker builds its own tree from the
+      current position, with its share of the playouts (or the whole
+      time budget). The visit counts of their root children are added
+      up to choose the move.
+    * "leaf" parallelism: the tree is kept here and grown by batches
+      of one new leaf per worker, selected with a virtual loss. Each
+      leaf is evaluated by leaf_batch playouts in a worker.
+
+    The seeds of the workers are drawn from the seed of the player, so
+    that results only depend on it when the budget is in playouts.
+    """
+    def __init__(self, _board_state, player, backend="bitboard",
+                 workers=None, parallel="root", leaf_batch=32, **options):
+        super().__init__(_board_state, player, backend=backend, **options)
+        self.backend_name = backend
+        self.workers = workers or os.cpu_count()
+        self.parallel = parallel
+        self.leaf_batch = leaf_batch
+        self.pool = None
+
+    def get_pool(self):
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.workers)
+            weakref.finalize(self, self.pool.terminate)
+        return self.pool
+
+    def start(self):
+        if self.parallel == "root":
+            self.stats.reset()
+            return self.root_parallel()
+        return super().start()
+
+    def root_parallel(self):
+        """
+        @return the move with the most visits over all the workers
+        """
+        options = {
+            "backend": self.backend_name,
+            "exploration": self.exploration,
+            "playouts": max(1, self.playouts // self.workers),
+            "move_time": self.move_time,
+            "rollout_batch": self.rollout_batch,
+            "network": self.network_path,
+        }
+        jobs = [
+            (self.root_state.copy(), self.player, options,
+             self.rng.getrandbits(32))
+            for _ in range(self.workers)
+        ]
+        visits = {}
+        for children in self.get_pool().map(_root_search, jobs):
+            for (move, n, wins) in children:
+                visits[move] = visits.get(move, 0) + n
+        self.stats.rollouts = sum(visits.values())
+        self.root_visits = visits
+        return max(visits, key=visits.get)
+
+    def search(self):
+        """
+        Leaf parallelism, by batches of one leaf per worker.
+        """
+        deadline = None
+        if self.move_time is not None:
+            deadline = time.monotonic() + self.move_time
+        pool = self.get_pool()
+        stones = self.board.count()
+
+        done = 0
+        while done < self.playouts:
+            self.stats.nodes += self.workers
+            leaves, jobs = [], []
+            for _ in range(self.workers):
+                node = self.descend()
+                leaves.append(node)
+                if not self.is_terminal(node):
+                    jobs.append((
+                        self.board.to_array(), 3 - node.player,
+                        self.leaf_batch, self.rng.getrandbits(32)
+                    ))
+                # Virtual loss, so that the next leaves differ
+                self.virtual_loss(node, 1)
+                while self.board.count() > stones:
+                    self.board.undo()
+
+            results = iter(pool.map(_leaf_playouts, jobs))
+            for node in leaves:
+                self.virtual_loss(node, -1)
+                if self.is_terminal(node):
+                    black_wins = self.leaf_batch * (node.player == logic.BLACK_PLAYER)
+                else:
+                    black_wins = next(results)
+                self.backpropagate(node, self.leaf_batch, black_wins)
+                done += self.leaf_batch
+                self.stats.rollouts += self.leaf_batch
+
+            if deadline is not None and time.monotonic() > deadline:
+                break
+
+    @staticmethod
+    def virtual_loss(node, visits):
+        """
+        Adds visits without wins to node and its ancestors.
+        """
+        while node is not None:
+            node.visits += visits
+            node = node.parent
+
+
+class Solver(PlayerStrat):
+    """
+    Exact play: the proof-number solver (cf. solver.py) looks for a
+    winning move within its node budget, and the fallback strategy
+    plays when it finds none. With endgame, the solver only runs once
+    at most that many cells are empty.
+
+    The solved positions are kept from one move to the next.
+    """
+    def __init__(self, _board_state, player, fallback="abheur",
+                 solver_nodes=50_000, endgame=None, **options):
+        super().__init__(_board_state, player, **options)
+        self.solver = ProofNumberSolver(solver_nodes)
+        self.endgame = endgame
+        self.fallback = str2strat[fallback](_board_state, player, **options)
+        # The fallback if it chose the last move
+        self.searched = None
+
+    def start(self):
+        self.stats.reset()
+        empty = self.root_state.size - np.count_nonzero(self.root_state)
+        if self.endgame is None or empty <= self.endgame:
+            board = BitBoard.from_array(self.root_state)
+            winner, move = self.solver.solve(board, self.player)
+            self.stats.nodes = self.solver.nodes
+            if move is not None:
+                self.searched = None
+                return move
+
+        solver_nodes = self.stats.nodes
+        self.searched = self.fallback
+        move = self.fallback.start()
+        for field, value in self.fallback.stats.as_dict().items():
+            setattr(self.stats, field, value)
+        self.stats.nodes += solver_nodes
+        return move
+
+    def notify_move(self, node, player):
+        self.fallback.notify_move(node, player)
+
+    def visit_counts(self):
+        return self.searched.visit_counts() if self.searched else None
+
+    def reset(self, _board_state):
+        super().reset(_board_state)
+        self.fallback.reset(_board_state)
+
+
+class Book(PlayerStrat):
+    """
+    Plays the moves of an opening book (cf. book.py) while the game is
+    in it, and lets the strategy search once it is out of it. Entries
+    whose score is below min_score for the player to move are ignored.
+    """
+    def __init__(self, _board_state, player, strategy, book=None,
+                 min_score=0., **options):
+        super().__init__(_board_state, player, **options)
+        self.book = OpeningBook(book)
+        self.min_score = min_score
+        self.strategy = strategy
+        # Whether the strategy chose the last move
+        self.searched = False
+
+    def start(self):
+        self.stats.reset()
+        self.searched = False
+        entry = self.book.lookup(self.root_state, self.player)
+        if entry is not None:
+            move, score, _ = entry
+            if score >= self.min_score and logic.is_node_free(move, self.root_state):
+                self.stats.book_hits = 1
+                return move
+
+        self.searched = True
+        move = self.strategy.start()
+        for field, value in self.strategy.stats.as_dict().items():
+            setattr(self.stats, field, value)
+        return move
+
+    def notify_move(self, node, player):
+        self.strategy.notify_move(node, player)
+
+    def visit_counts(self):
+        return self.strategy.visit_counts() if self.searched else None
+
+    def reset(self, _board_state):
+        super().reset(_board_state)
+        self.strategy.reset(_board_state)
+
+
+def make_player(strategy_name, _board_state, player, options):
+    """
+    @return a player of the strategy. With the endgame option, the
+            strategy is the fallback of a Solver, which takes over at
+            the end of the games. With the book option, the player
+            first looks the positions up in the opening book.
+    """
+    if options.get("book") is not None:
+        strategy = make_player(strategy_name, _board_state, player,
+                               dict(options, book=None))
+        return Book(_board_state, player, strategy, **options)
+    if options.get("endgame") is not None and strategy_name != "solver":
+        return Solver(_board_state, player,
+                      **dict(options, fallback=strategy_name))
+    return str2strat[strategy_name](_board_state, player, **options)
+
 
 str2strat: dict[str, PlayerStrat] = {
         "human": None,
         "random": Random,
         "minimax": MiniMax,
         "abheur" : ABheur,
+        "montecarlo": MonteCarlo,
+        "mcts": MCTS,
+        "mcts_parallel": ParallelMCTS,
+        "solver": Solver,
 }
 
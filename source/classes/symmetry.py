@@ -0,0 +1,187 @@
+from functools import lru_cache
+from typing import Optional
+
+import classes.logic as logic
+from classes.board import get_zobrist
+
+# Symmetries of Hex positions. Two transformations map a position to an
+# equivalent one:
+#   * ROTATE, the 180 degrees rotation of the board: cell (x, y) becomes
+#     (n - 1 - x, n - 1 - y), each player keeps its edges,
+#   * SWAP, the exchange of the colours along with the transposition of
+#     the board: a stone of a player on (x, y) becomes a stone of the
+#     other one on (y, x), so that each player gets the other's edges.
+#     The player to move is swapped too: the value of the position for
+#     a player is the value of the swapped one for the other.
+# SWAP_ROTATE is the composition of both. Every transformation is its
+# own inverse.
+#
+# A position is cached under its canonical key, the smallest Zobrist
+# hash of its transformations, so that the caches (transposition
+# tables, evaluations, opening books) hold one entry for all of them.
+# The keys of the transformations are kept up to date move by move by
+# `SymmetricKeys`, at the cost of a few XORs.
+
+IDENTITY = 0
+ROTATE = 1
+SWAP = 2
+SWAP_ROTATE = 3
+TRANSFORMS = (IDENTITY, ROTATE, SWAP, SWAP_ROTATE)
+
+
+class Symmetry:
+    """
+    The tables of the transformations of a board of a given size (see
+    get_symmetry). Cells are flat indices x * board_size + y.
+        * cell_maps: for each transformation, the image of each cell,
+        * swaps: whether each transformation exchanges the colours,
+        * zobrist: for each transformation, the keys that hash a
+          position as its image: zobrist[t][player][cell] is the key
+          of the image of a stone of player on cell, and
+          zobrist[t]["to_move"][player] that of the image of player
+          being to move.
+    """
+    def __init__(self, board_size: int):
+        n = self.board_size = board_size
+        self.n_cells = n * n
+        last = self.n_cells - 1
+
+        def transpose(index):
+            x, y = divmod(index, n)
+            return y * n + x
+
+        self.cell_maps = (
+            tuple(range(self.n_cells)),
+            tuple(last - i for i in range(self.n_cells)),
+            tuple(transpose(i) for i in range(self.n_cells)),
+            tuple(last - transpose(i) for i in range(self.n_cells)),
+        )
+        self.swaps = (False, False, True, True)
+
+        keys = get_zobrist(n)
+        self.zobrist = []
+        for t in TRANSFORMS:
+            cell_map, swap = self.cell_maps[t], self.swaps[t]
+            table = {"to_move": {}}
+            for player in (logic.BLACK_PLAYER, logic.WHITE_PLAYER):
+                image = 3 - player if swap else player
+                table[player] = [keys[image][cell_map[i]]
+                                 for i in range(self.n_cells)]
+                table["to_move"][player] = keys["to_move"][image]
+            self.zobrist.append(table)
+
+    def cell(self, index: int, transform: int) -> int:
+        """
+        @return   The image of the cell index by transform, which is
+                  also its preimage.
+        """
+        return self.cell_maps[transform][index]
+
+    def move(self, move: tuple, transform: int) -> tuple:
+        """
+        @return   The image of the (x, y) move by transform.
+        """
+        (x, y) = move
+        index = self.cell_maps[transform][int(x) * self.board_size + int(y)]
+        return divmod(index, self.board_size)
+
+    def keys(self, cells: list) -> list:
+        """
+        @return   The Zobrist key of the stones of each transformation of
+                  the position, given its flat cells (cf.
+                  HexBoard.cells), the first one being HexBoard.key.
+        """
+        keys = []
+        for table in self.zobrist:
+            key = 0
+            for index, cell in enumerate(cells):
+                if cell:
+                    key ^= table[cell][index]
+            keys.append(key)
+        return keys
+
+    def canonical(self, keys: list, to_move: Optional[int] = None) -> tuple:
+        """
+        @return   (key, transform): the canonical key of the position,
+                  given the keys of its transformations, and the
+                  transformation it is the key of. Without to_move the
+                  key only depends on the stones.
+        """
+        best, best_transform = None, IDENTITY
+        for t in TRANSFORMS:
+            key = keys[t]
+            if to_move is not None:
+                key ^= self.zobrist[t]["to_move"][to_move]
+            if best is None or key < best:
+                best, best_transform = key, t
+        return best, best_transform
+
+
+@lru_cache(maxsize=None)
+def get_symmetry(board_size: int) -> Symmetry:
+    """
+    @return   The (shared, read only) symmetry tables of a board of the
+              given size.
+    """
+    return Symmetry(board_size)
+
+
+class SymmetricKeys:
+    """
+    The keys of the transformations of a position, updated as stones
+    are played and taken back, for the searches that walk the game
+    tree with make/unmake (cf. MiniMax).
+    """
+    def __init__(self, board_size: int):
+        self.symmetry = symmetry = get_symmetry(board_size)
+        # The keys of all the transformations of each (player, cell),
+        # and of each player to move
+        self.cell_keys = {
+            player: [tuple(table[player][i] for table in symmetry.zobrist)
+                     for i in range(symmetry.n_cells)]
+            for player in (logic.BLACK_PLAYER, logic.WHITE_PLAYER)
+        }
+        self.to_move_keys = {
+            player: tuple(table["to_move"][player]
+                          for table in symmetry.zobrist)
+            for player in (logic.BLACK_PLAYER, logic.WHITE_PLAYER)
+        }
+        self.keys = [0] * len(TRANSFORMS)
+        self.history = []
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        @return   The keys of the stones of board, a HexBoard.
+        """
+        instance = cls(board.board_size)
+        instance.keys = instance.symmetry.keys(board.cells())
+        return instance
+
+    def play(self, index: int, player: int) -> None:
+        keys = self.keys
+        a, b, c, d = self.cell_keys[player][index]
+        keys[0] ^= a
+        keys[1] ^= b
+        keys[2] ^= c
+        keys[3] ^= d
+        self.history.append((index, player))
+
+    def undo(self) -> None:
+        index, player = self.history.pop()
+        keys = self.keys
+        a, b, c, d = self.cell_keys[player][index]
+        keys[0] ^= a
+        keys[1] ^= b
+        keys[2] ^= c
+        keys[3] ^= d
+
+    def canonical(self, to_move: Optional[int] = None) -> tuple:
+        """
+        @return   (key, transform), cf. Symmetry.canonical.
+        """
+        keys = self.keys
+        if to_move is not None:
+            keys = [k ^ m for (k, m) in zip(keys, self.to_move_keys[to_move])]
+        key = min(keys)
+        return key, keys.index(key)
@@ -1,24 +1,47 @@
 import os
-import pickle
+import random
 import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 from rich import print
-from rich.logging import RichHandler
 
 # Hide Pygame welcome message
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "hide"
-import pygame
-import pandas as pd
 
 from classes.logic import player2str
 from classes.game import Game
-
-FORMAT = "%(message)s"
-logging.basicConfig(
-    level="NOTSET",
-    format=FORMAT,
-    datefmt="[%X]",
-    handlers=[RichHandler()]
-)
+from classes.results import ResultsWriter
+
+# pygame is only imported when the games are displayed, so that
+# headless runs and their worker processes start quickly. Logging is
+# configured by main.py.
+
+
+def _play_game(args) -> dict:
+    """
+    Plays a headless game, in a worker process of a parallel
+    championship. The players are built for this game only, and all
+    the random generators are seeded from the seed of the game (each
+    player with its own, cf. Game.ai_turn), so that its result does
+    not depend on the worker playing it.
+
+    @return   The record of the game (cf. results.py).
+    """
+    board_size, strat, black_starts, options, seed, instruments, game_id = args
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+
+    game = Game(board_size=board_size,
+                black_starts=black_starts,
+                strat=strat,
+                use_ui=False,
+                options=dict(options, seed=seed),
+                instruments=instruments,
+                game_id=game_id)
+    while game.winner is None:
+        game.play()
+    return game.record(seed=seed)
 
 
 class Tournament:
@@ -28,13 +51,28 @@ class Tournament:
            * the size of the board,
            * the players strategies, eg., ("human", "random"),
            * the game counter,
-           * the number of games to play.
+           * the number of games to play,
+           * whether the UI is displayed,
+           * the options given to the AI strategies,
+           * the number of games played in parallel,
+           * the file the results are appended to (None for none),
+           * the instruments observing the games (cf. stats.py).
         """
         self.args = args
         (self.BOARD_SIZE, self.STRAT, self.GAME_COUNT,
-         self.N_GAMES, self.USE_UI) = args
+         self.N_GAMES, self.USE_UI, self.OPTIONS, self.JOBS,
+         self.RESULTS, self.INSTRUMENTS) = args
+
+        self.results = None
+        if self.RESULTS is not None:
+            self.results = ResultsWriter(self.RESULTS)
+
+        # AI players, created by the first game and kept for the whole
+        # tournament (see PlayerStrat.reset)
+        self.players = {}
 
         if self.USE_UI:
+            import pygame
             pygame.init()
             pygame.display.set_caption("Polyline")
 
@@ -49,33 +87,80 @@ class Tournament:
         game = Game(board_size=self.BOARD_SIZE,
                     black_starts=black_starts, 
                     strat=self.STRAT,
-                    use_ui=self.USE_UI)
+                    use_ui=self.USE_UI,
+                    options=self.OPTIONS,
+                    players=self.players,
+                    instruments=self.INSTRUMENTS,
+                    game_id=self.GAME_COUNT)
         game.print_game_info(
             [self.BOARD_SIZE, self.STRAT, self.GAME_COUNT]
         )
         while game.winner is None:
             game.play()
 
-        print(f"{player2str[game.winner]} player ({self.STRAT[game.winner-1]}) wins!")
+        self.print_winner(game.winner)
+        self.save(game.record(seed=self.OPTIONS.get("seed")))
 
         return game.winner
 
+    def save(self, record: dict) -> None:
+        """
+        Appends the record of a game to the results file, if any.
+        """
+        if self.results is not None:
+            self.results.write(record)
+
+    def print_winner(self, winner: int) -> None:
+        print(f"{player2str[winner]} player ({self.STRAT[winner-1]}) wins!")
+
+    def parallel_games(self) -> list:
+        """
+        Plays the games of the championship on a pool of self.JOBS
+        processes. Game i is played with the seed of the tournament
+        plus i, so a run is reproduced by giving the same --seed.
+
+        @return   The winners, in the order of the games. Records are
+                  saved as soon as the games are over (in order).
+        """
+        log = logging.getLogger("rich")
+        seed = self.OPTIONS.get("seed")
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        log.info(f"Seed of the tournament: {seed}")
+
+        jobs = [
+            (self.BOARD_SIZE, self.STRAT, i < self.N_GAMES / 2,
+             self.OPTIONS, seed + i, self.INSTRUMENTS, i)
+            for i in range(self.N_GAMES)
+        ]
+        winners = []
+        with ProcessPoolExecutor(max_workers=self.JOBS) as executor:
+            for record in executor.map(_play_game, jobs):
+                self.print_winner(record["winner"])
+                self.save(record)
+                winners.append(record["winner"])
+        return winners
+
     def championship(self):
         """
         Runs a number of games between the same two opponents.
         """
         scores = [0, 0]
 
-        for _ in range(self.N_GAMES):
-            self.GAME_COUNT = _
-
-            # First half of the tournament started by one player.
-            # Remaining half started by other player (see "no pie
-            #  rule")
-            winner = self.single_game(
-                black_starts=self.GAME_COUNT < self.N_GAMES / 2
-            )
-            scores[winner-1] += 1
+        if self.JOBS > 1 and not self.USE_UI:
+            for winner in self.parallel_games():
+                scores[winner-1] += 1
+        else:
+            for _ in range(self.N_GAMES):
+                self.GAME_COUNT = _
+
+                # First half of the tournament started by one player.
+                # Remaining half started by other player (see "no pie
+                #  rule")
+                winner = self.single_game(
+                    black_starts=self.GAME_COUNT < self.N_GAMES / 2
+                )
+                scores[winner-1] += 1
 
         log = logging.getLogger("rich")
 
@@ -0,0 +1,208 @@
+import time
+import logging
+
+import numpy as np
+
+import classes.logic as logic
+
+from classes.network import Network, KERNEL_OFFSETS
+from classes.selfplay import list_shards, load_shard
+from classes.symmetry import get_symmetry, ROTATE
+
+# Training of the policy / value networks (cf. network.py) on the
+# positions recorded by self-play (cf. selfplay.py), on CPU.
+#
+# The loss of a position is the cross-entropy between the policy and
+# the visits of the search, plus value_weight times the squared error
+# of the value against the result of the game. The gradients are
+# computed by hand, layer by layer, and the parameters are updated by
+# minibatch SGD with momentum and weight decay.
+
+
+def batches(directory: str, batch_size: int, rng, augment: bool = True):
+    """
+    Streams minibatches of the shards of directory, in a random order:
+    the shards are read one at a time, memory mapped when they are
+    uncompressed (a compressed shard is decompressed as a whole), and
+    their positions are drawn in a random order.
+
+    @return   An iterator over (cells, to_move, visits, results)
+              batches, for one pass over the data. With augment, the
+              positions are rotated at random (cf. augment_batch).
+    """
+    shards = list_shards(directory)
+    for s in rng.permutation(len(shards)):
+        shard = load_shard(shards[s])
+        arrays = {name: shard[name] for name in
+                  ("cells", "to_move", "visits", "results")}
+        size = len(arrays["results"])
+        order = rng.permutation(size)
+        for start in range(0, size, batch_size):
+            # Sorted indices read the memory mapped arrays in order
+            rows = np.sort(order[start:start + batch_size])
+            batch = tuple(np.asarray(arrays[name][rows]) for name in
+                          ("cells", "to_move", "visits", "results"))
+            if augment:
+                batch = augment_batch(*batch, rng)
+            yield batch
+
+
+def augment_batch(cells, to_move, visits, results, rng) -> tuple:
+    """
+    @return   The batch with each position rotated by a half turn, or
+              not, at random. Rotation is the only effective symmetry:
+              the colour swapping ones (cf. symmetry.py) give the same
+              input planes and targets as the position itself, the
+              network seeing every position by the player to move.
+    """
+    n_cells = cells.shape[1]
+    symmetry = get_symmetry(int(round(np.sqrt(n_cells))))
+    rows = rng.random(len(cells)) < .5
+    cells, visits = cells.copy(), visits.copy()
+    if rows.any():
+        # The image of cell i is cell_map[i]
+        inverse = np.argsort(symmetry.cell_maps[ROTATE])
+        cells[rows] = cells[rows][:, inverse]
+        visits[rows] = visits[rows][:, inverse]
+    return cells, to_move, visits, results
+
+
+def loss_and_gradients(network: Network, cells, to_move, visits, results,
+                       value_weight: float = 1.) -> tuple:
+    """
+    @return   (policy loss, value loss, gradients): the mean losses of
+              the batch and the gradient of their weighted sum with
+              respect to each parameter of network.
+    """
+    params = network.params
+    planes, empty = network.encode(cells, to_move)
+    batch, n = empty.shape[0], empty.shape[1]
+    # The visits seen by the player to move, like the planes
+    targets = visits.reshape(batch, n, n)
+    targets = np.where((to_move == logic.WHITE_PLAYER)[:, None, None],
+                       targets.transpose(0, 2, 1), targets)
+
+    # Forward, keeping the intermediate arrays
+    logits, values, trace = network.forward(planes, empty, trace=True)
+    inputs, outputs = trace["inputs"], trace["outputs"]
+    mean, hidden = trace["mean"], trace["hidden"]
+    x = outputs[-1]
+
+    logits = logits - logits.max(axis=(1, 2), keepdims=True)
+    log_policy = logits - np.log(np.exp(logits).sum(axis=(1, 2), keepdims=True))
+    # The stones, where log_policy is -inf, are never targets
+    policy_loss = -(targets * np.where(targets > 0, log_policy, 0.)).sum() / batch
+
+    errors = values - results
+    value_loss = float(np.mean(errors ** 2))
+
+    # Backward
+    grads = {}
+    d_logits = (np.exp(log_policy) - targets) / batch
+    grads["policy.w"] = x.reshape(-1, x.shape[3]).T @ d_logits.reshape(-1, 1)
+    grads["policy.b"] = np.array([d_logits.sum()])
+    d_x = d_logits[..., None] * params["policy.w"][:, 0]
+
+    d_output = (value_weight * 2 * errors / batch * (1 - values ** 2))[:, None]
+    grads["value2.w"] = hidden.T @ d_output
+    grads["value2.b"] = d_output.sum(axis=0)
+    d_hidden = (d_output @ params["value2.w"].T) * (hidden > 0)
+    grads["value1.w"] = mean.T @ d_hidden
+    grads["value1.b"] = d_hidden.sum(axis=0)
+    d_x = d_x + (d_hidden @ params["value1.w"].T)[:, None, None, :] / (n * n)
+
+    for i in reversed(range(network.layers)):
+        d_z = d_x * (outputs[i] > 0)
+        x_in = inputs[i]
+        channels = x_in.shape[3]
+        weights = params[f"conv{i}.w"].reshape(len(KERNEL_OFFSETS), channels, -1)
+        d_z_flat = d_z.reshape(-1, d_z.shape[3])
+        d_weights = np.empty_like(weights)
+        d_input = np.zeros_like(x_in) if i else None
+        for k, (dx, dy) in enumerate(KERNEL_OFFSETS):
+            window = (slice(None), slice(1 + dx, n + 1 + dx),
+                      slice(1 + dy, n + 1 + dy), slice(None))
+            d_weights[k] = x_in[window].reshape(-1, channels).T @ d_z_flat
+            if i:
+                d_input[window] += d_z @ weights[k].T
+        grads[f"conv{i}.w"] = d_weights.reshape(-1, weights.shape[2])
+        grads[f"conv{i}.b"] = d_z.sum(axis=(0, 1, 2))
+        if i:
+            # Through the padding of the layer input
+            d_x = d_input[:, 1:n + 1, 1:n + 1, :]
+
+    return float(policy_loss), value_loss, grads
+
+
+class SGD:
+    """
+    Minibatch stochastic gradient descent with momentum and weight
+    decay (not applied to the biases).
+    """
+    def __init__(self, params: dict, lr: float = 0.01, momentum: float = 0.9,
+                 weight_decay: float = 1e-4):
+        self.params = params
+        self.lr = lr
+        self.momentum = momentum
+        self.weight_decay = weight_decay
+        self.velocities = {name: np.zeros_like(value)
+                           for name, value in params.items()}
+
+    def step(self, grads: dict) -> None:
+        for name, grad in grads.items():
+            if name.endswith(".w"):
+                grad = grad + self.weight_decay * self.params[name]
+            velocity = self.velocities[name]
+            velocity *= self.momentum
+            velocity -= self.lr * grad
+            self.params[name] += velocity
+
+
+def train(network: Network, directory: str, epochs: int = 1,
+          batch_size: int = 256, lr: float = 0.01, momentum: float = 0.9,
+          weight_decay: float = 1e-4, value_weight: float = 1.,
+          augment: bool = True, seed: int = 0,
+          log_every: int = 100) -> Network:
+    """
+    Trains network on the self-play shards of directory, logging the
+    mean losses and the throughput every log_every batches and at the
+    end of each epoch.
+
+    @return   The trained network (float32 copies of the parameters,
+              which are not memory mapped anymore).
+    """
+    log = logging.getLogger("rich")
+    network = Network({name: np.array(value, dtype=np.float32)
+                       for name, value in network.params.items()},
+                      network.config)
+    optimizer = SGD(network.params, lr, momentum, weight_decay)
+    rng = np.random.default_rng(seed)
+
+    for epoch in range(epochs):
+        start = time.perf_counter()
+        samples = 0
+        totals = np.zeros(2)
+        count = 0
+        for i, batch in enumerate(batches(directory, batch_size, rng, augment)):
+            policy_loss, value_loss, grads = loss_and_gradients(
+                network, *batch, value_weight=value_weight)
+            optimizer.step(grads)
+            samples += len(batch[0])
+            totals += (policy_loss, value_loss)
+            count += 1
+            if (i + 1) % log_every == 0:
+                elapsed = time.perf_counter() - start
+                log.info(f"Epoch {epoch}, batch {i + 1}: policy loss"
+                         f" {totals[0] / count:.4f}, value loss"
+                         f" {totals[1] / count:.4f},"
+                         f" {samples / elapsed:.0f} samples/s")
+                totals[:] = 0
+                count = 0
+        elapsed = time.perf_counter() - start
+        message = f"Epoch {epoch} done: {samples} samples in {elapsed:.1f}s," \
+                  f" {samples / max(elapsed, 1e-9):.0f} samples/s"
+        if count:
+            message += (f", policy loss {totals[0] / count:.4f},"
+                        f" value loss {totals[1] / count:.4f}")
+        log.info(message)
+    return network
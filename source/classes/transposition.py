@@ -0,0 +1,106 @@
+from typing import Optional
+
+import numpy as np
+
+# Bound types of the stored values
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class TranspositionTable:
+    """
+    Bounded hash table of search results, indexed by Zobrist keys.
+
+    Entries are stored in parallel NumPy arrays, so that the memory
+    used is known in advance. Each slot holds the key, the remaining
+    depth of the search, the bound type, the value, the best move (as
+    a cell index, -1 if none) and the generation (i.e. the search)
+    that stored it.
+
+    Replacement policy: a slot is overwritten by an entry of the same
+    position, by any entry of a newer search, or by a search at least
+    as deep. Deep results of the current search are thus kept.
+    """
+    ENTRY_SIZE = 8 + 8 + 1 + 1 + 2 + 1
+
+    def __init__(self, size_mb: float = 16):
+        n_entries = max(1, int(size_mb * 2 ** 20) // self.ENTRY_SIZE)
+        # Power of two so that the index is a mask of the key
+        n_entries = 1 << (n_entries.bit_length() - 1)
+        self.mask = n_entries - 1
+
+        self.keys = np.zeros(n_entries, dtype=np.uint64)
+        self.values = np.zeros(n_entries, dtype=np.float64)
+        self.depths = np.full(n_entries, -1, dtype=np.int8)
+        self.flags = np.zeros(n_entries, dtype=np.int8)
+        self.moves = np.full(n_entries, -1, dtype=np.int16)
+        self.generations = np.zeros(n_entries, dtype=np.uint8)
+        self.generation = 0
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def __len__(self) -> int:
+        return self.mask + 1
+
+    def new_search(self) -> None:
+        """
+        Ages the stored entries, which become replaceable by any entry
+        of the new search.
+        """
+        self.generation = (self.generation + 1) % 256
+
+    def probe(self, key: int) -> Optional[tuple]:
+        """
+        @return   (depth, flag, value, move) stored for key, or None.
+        """
+        index = key & self.mask
+        if self.depths[index] >= 0 and int(self.keys[index]) == key:
+            self.hits += 1
+            return (int(self.depths[index]), int(self.flags[index]),
+                    float(self.values[index]), int(self.moves[index]))
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, flag: int, value: float,
+              move: int = -1) -> None:
+        """
+        Saves a search result, following the replacement policy.
+        """
+        index = key & self.mask
+        stored_depth = self.depths[index]
+        if stored_depth >= 0:
+            same = int(self.keys[index]) == key
+            if not (same or self.generations[index] != self.generation
+                    or depth >= stored_depth):
+                return
+            if not same:
+                self.overwrites += 1
+
+        self.keys[index] = key
+        self.depths[index] = min(depth, 127)
+        self.flags[index] = flag
+        self.values[index] = value
+        self.moves[index] = move
+        self.generations[index] = self.generation
+        self.stores += 1
+
+    def clear(self) -> None:
+        self.depths.fill(-1)
+
+    def stats(self) -> dict:
+        """
+        @return   The counters of the table.
+        """
+        probes = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / probes if probes else 0.,
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+        }
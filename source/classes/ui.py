@@ -1,5 +1,6 @@
 import sys
 from typing import Optional
+from functools import lru_cache
 from math import cos, sin, pi, radians
 
 import pygame
@@ -8,32 +9,159 @@ from pygame import time
 from pygame import gfxdraw
 
 import classes.logic as logic
+from classes.noui import NoUI
+
+# Rendering of the board.
+#
+# Nothing that does not change during a game is computed twice: the
+# geometry of the tiles (centers, vertices, edges) is computed once per
+# board size (cf. get_geometry), and the background (the empty board,
+# its coloured edges and coordinates) is drawn once per board size too.
+# Each UI keeps a copy of the background on which the stones are drawn,
+# `board`, and only the tiles changed by `update_tile_color` since the
+# last frame are drawn on it and copied to the screen. The hovered tile
+# is drawn on the screen only, and erased by copying its area back from
+# the board.
+#
+# Tiles are on an axial grid: the center of the tile (row, column) is
+# row * (r, 1.75r) + column * (2r, 0) from the first one, r being the
+# radius of the hexagons. The tile under the mouse is found by mapping
+# its position back to fractional axial coordinates and rounding them
+# to the nearest tile.
+
+HEX_RADIUS = 20
+X_OFFSET, Y_OFFSET = 60, 60
+TEXT_OFFSET = 45
+# Margin between a tile and its outline
+OUTLINE = 3
+
+
+class Geometry:
+    """
+    The screen geometry of the tiles of a board of the given size,
+    indexed by node (row * board_size + column):
+        * centers: the center of each tile,
+        * shapes, outlines: the vertices of each hexagon and of its
+          outline,
+        * areas: the rectangle covering each outline, with a margin for
+          antialiasing,
+        * borders: the (points, player) of the triangles colouring the
+          edges of the board.
+    """
+    def __init__(self, board_size: int, hex_radius: int = HEX_RADIUS):
+        self.board_size = board_size
+        self.hex_radius = hex_radius
+        self.size = (
+            X_OFFSET + (2 * hex_radius) * board_size + hex_radius * board_size,
+            round(Y_OFFSET + (1.75 * hex_radius) * board_size)
+        )
 
+        n_nodes = board_size ** 2
+        self.centers = [self.center(*divmod(node, board_size))
+                        for node in range(n_nodes)]
+        self.shapes = [self.hexagon(center, hex_radius)
+                       for center in self.centers]
+        self.outlines = [self.hexagon(center, hex_radius + OUTLINE)
+                         for center in self.centers]
+        self.areas = []
+        for outline in self.outlines:
+            xs, ys = zip(*outline)
+            left, top = int(min(xs)) - 2, int(min(ys)) - 2
+            self.areas.append(pygame.Rect(
+                left, top, int(max(xs)) + 3 - left, int(max(ys)) + 3 - top))
+        self.borders = self._borders()
+
+    def center(self, row: int, column: int) -> tuple:
+        x = X_OFFSET + (2 * self.hex_radius) * column + self.hex_radius * row
+        y = Y_OFFSET + (1.75 * self.hex_radius) * row
+        return x, y
+
+    @staticmethod
+    def hexagon(center: tuple, radius: float) -> list:
+        x, y = center
+        return [(x + radius * cos(radians(90) + 2 * pi * _ / 6),
+                 y + radius * sin(radians(90) + 2 * pi * _ / 6))
+                for _ in range(6)]
+
+    def _borders(self) -> list:
+        n = self.board_size
+        outlines = self.outlines
+        borders = []
+
+        def triangle(vertices, offset, sign):
+            return [[vertex[_] + sign * offset[_] for _ in range(2)]
+                    for vertex in vertices]
+
+        for node in range(n ** 2):
+            # Top side
+            if 0 < node < n:
+                borders.append((triangle(
+                    (outlines[node - 1][3], outlines[node - 1][4],
+                     outlines[node][3]), (0, 3), -1), logic.WHITE_PLAYER))
+            # Bottom side
+            if n ** 2 - n < node < n ** 2:
+                borders.append((triangle(
+                    (outlines[node - 1][0], outlines[node - 1][5],
+                     outlines[node][0]), (0, 3), 1), logic.WHITE_PLAYER))
+            # Left side
+            if node % n == 0 and node >= n:
+                borders.append((triangle(
+                    (outlines[node - n][1], outlines[node - n][0],
+                     outlines[node][1]), (3, -3), -1), logic.BLACK_PLAYER))
+            # Right side
+            if (node + 1) % n == 0 and node > n:
+                borders.append((triangle(
+                    (outlines[node - n][4], outlines[node - n][5],
+                     outlines[node][4]), (3, -3), 1), logic.BLACK_PLAYER))
+        return borders
+
+    def node_at(self, position: tuple) -> Optional[int]:
+        """
+        @return   The node of the tile nearest to position, a point of
+                  the screen, or None if it is off the board.
+        """
+        x, y = position
+        # Fractional axial coordinates
+        row = (y - Y_OFFSET) / (1.75 * self.hex_radius)
+        column = (x - X_OFFSET - self.hex_radius * row) / (2 * self.hex_radius)
+        # Rounded in cube coordinates (column, row, -column - row)
+        third = -column - row
+        r_column, r_row, r_third = round(column), round(row), round(third)
+        d_column = abs(r_column - column)
+        d_row = abs(r_row - row)
+        d_third = abs(r_third - third)
+        if d_column > d_row and d_column > d_third:
+            r_column = -r_row - r_third
+        elif d_row > d_third:
+            r_row = -r_column - r_third
+        if 0 <= r_row < self.board_size and 0 <= r_column < self.board_size:
+            return r_row * self.board_size + r_column
+        return None
 
-class NoUI:
-    def __init__(self, board_size: int):
-        self.last_clicked_node = None
-    def draw(self, strat, current_strategie):
-        pass
-    def update_tile_color(self, coordinates: tuple, player: Optional[int]):
-        pass
-    def handle_events(self, strat) -> None:
-        pass
+
+@lru_cache(maxsize=None)
+def get_geometry(board_size: int) -> Geometry:
+    """
+    @return   The (shared, read only) geometry of a board of the given
+              size.
+    """
+    return Geometry(board_size)
 
 
 class UI:
+    # Background of each board size, drawn by the first UI of the size
+    backgrounds = {}
+
     def __init__(self, board_size: int):
         self.board_size = board_size
         assert 1 < self.board_size <= 26
 
         self.clock = time.Clock()
-        self.hex_radius = 20
-        self.x_offset, self.y_offset = 60, 60
-        self.text_offset = 45
-        self.screen = pygame.display.set_mode(
-            (self.x_offset + (2 * self.hex_radius) * self.board_size + self.hex_radius * self.board_size,
-             round(self.y_offset + (1.75 * self.hex_radius) * self.board_size))
-        )
+        self.hex_radius = HEX_RADIUS
+        self.x_offset, self.y_offset = X_OFFSET, Y_OFFSET
+        self.text_offset = TEXT_OFFSET
+        self.geometry = get_geometry(board_size)
+        self.screen = pygame.display.set_mode(self.geometry.size)
 
         # Colors
         self.red = (222, 29, 47)
@@ -44,11 +172,11 @@ class UI:
         self.gray = (70, 70, 70)
         self.bg = (249,224,167)
 
-        self.screen.fill(self.gray)
         self.fonts = pygame.font.SysFont("Sans", 20)
+        self.node_font = pygame.font.SysFont("Sans", 18)
+        # Hover label of each (node, foreground, background)
+        self.labels = {}
 
-        self.hex_lookup = {}
-        self.rects = []
         self.color = [self.bg] * (self.board_size ** 2)
         self.last_clicked_node = None
 
@@ -57,103 +185,44 @@ class UI:
             logic.WHITE_PLAYER: self.white
         }
 
-    # Drawing functions
+        # The board with its stones, the tiles to draw on it and the
+        # areas of the screen to update
+        if board_size not in self.backgrounds:
+            self.backgrounds[board_size] = self._draw_background()
+        self.board = self.backgrounds[board_size].copy()
+        self.dirty = set()
+        self.hovered = None
+        self.updated = []
+        self.screen.blit(self.board, (0, 0))
+        self.full_update = True
 
-    def _draw_hexagon(self, surface: object, color: tuple,
-                     position: tuple, node: int):
-        # Vertex count and radius
-        n = 6
-        x, y = position
-        offset = 3
-
-        # Outline
-        self.hex_lookup[node] = [
-            (x + (self.hex_radius + offset) * cos(radians(90) + 2 * pi * _ / n),
-             y + (self.hex_radius + offset) * sin(radians(90) + 2 * pi * _ / n))
-            for _ in range(n)
-        ]
-        gfxdraw.aapolygon(
-            surface, self.hex_lookup[node], color
-        )
+    # Drawing functions
 
+    def _draw_background(self) -> pygame.Surface:
+        """
+        @return   The surface of the empty board: its tiles, coloured
+                  edges and coordinates.
+        """
+        surface = pygame.Surface(self.geometry.size)
+        surface.fill(self.gray)
+        for node in range(self.board_size ** 2):
+            self._draw_tile(surface, node)
+        for (points, player) in self.geometry.borders:
+            color = self.player2color[player]
+            gfxdraw.filled_polygon(surface, points, color)
+            gfxdraw.aapolygon(surface, points, color)
+        self._draw_text(surface)
+        return surface
+
+    def _draw_tile(self, surface: pygame.Surface, node: int) -> None:
         # Shape
         gfxdraw.filled_polygon(
-            surface,
-            [(x + self.hex_radius * cos(radians(90) + 2 * pi * _ / n),
-              y + self.hex_radius * sin(radians(90) + 2 * pi * _ / n))
-             for _ in range(n)],
-            self.color[node]
+            surface, self.geometry.shapes[node], self.color[node]
         )
-
         # Antialiased shape outline
-        gfxdraw.aapolygon(
-            surface,
-            [(x + self.hex_radius * cos(radians(90) + 2 * pi * _ / n),
-              y + self.hex_radius * sin(radians(90) + 2 * pi * _ / n))
-            for _ in range(n)],
-            self.gray)
-
-        # Placeholder
-        rect = pygame.draw.rect(
-            surface,
-            self.color[node],
-            pygame.Rect(
-                x - self.hex_radius + offset,
-                y - (self.hex_radius / 2),
-                (self.hex_radius * 2) - (2 * offset),
-                self.hex_radius
-            )
-        )
-        self.rects.append(rect)
-
-        # Bounding box (colour-coded)
-        bbox_offset = [0, 3]
+        gfxdraw.aapolygon(surface, self.geometry.shapes[node], self.gray)
 
-        # Top side
-        if 0 < node < self.board_size:
-            points = (
-                [self.hex_lookup[node - 1][3][_] - bbox_offset[_] for _ in range(2)],
-                [self.hex_lookup[node - 1][4][_] - bbox_offset[_] for _ in range(2)],
-                [self.hex_lookup[node][3][_] - bbox_offset[_] for _ in range(2)]
-            )
-            gfxdraw.filled_polygon(surface, points, self.white)
-            gfxdraw.aapolygon(surface, points, self.white)
-
-        # Bottom side
-        if self.board_size ** 2 - self.board_size < node < self.board_size ** 2:
-            points = (
-                [self.hex_lookup[node - 1][0][_] + bbox_offset[_] for _ in range(2)],
-                [self.hex_lookup[node - 1][5][_] + bbox_offset[_] for _ in range(2)],
-                [self.hex_lookup[node][0][_] + bbox_offset[_] for _ in range(2)]
-            )
-            gfxdraw.filled_polygon(surface, points, self.white)
-            gfxdraw.aapolygon(surface, points, self.white)
-
-        # Left side
-        bbox_offset = [3, -3]
-
-        if node % self.board_size == 0:
-            if node >= self.board_size:
-                points = (
-                    [self.hex_lookup[node - self.board_size][1][_] - bbox_offset[_] for _ in range(2)],
-                    [self.hex_lookup[node - self.board_size][0][_] - bbox_offset[_] for _ in range(2)],
-                    [self.hex_lookup[node][1][_] - bbox_offset[_] for _ in range(2)]
-                )
-                gfxdraw.filled_polygon(surface, points, self.black)
-                gfxdraw.aapolygon(surface, points, self.black)
-
-        # Right side
-        if (node + 1) % self.board_size == 0:
-            if node > self.board_size:
-                points = (
-                    [self.hex_lookup[node - self.board_size][4][_] + bbox_offset[_] for _ in range(2)],
-                    [self.hex_lookup[node - self.board_size][5][_] + bbox_offset[_] for _ in range(2)],
-                    [self.hex_lookup[node][4][_] + bbox_offset[_] for _ in range(2)]
-                )
-                gfxdraw.filled_polygon(surface, points, self.black)
-                gfxdraw.aapolygon(surface, points, self.black)
-
-    def _draw_text(self):
+    def _draw_text(self, surface: pygame.Surface) -> None:
         alphabet = list(map(chr, range(97, 123)))
 
         for _ in range(self.board_size):
@@ -165,7 +234,7 @@ class UI:
                 self.x_offset + (2 * self.hex_radius) * _,
                 self.text_offset / 2
             )
-            self.screen.blit(text, text_rect)
+            surface.blit(text, text_rect)
 
             # Rows
             text = self.fonts.render(
@@ -175,13 +244,13 @@ class UI:
                 (self.text_offset / 4 + self.hex_radius * _,
                  self.y_offset + (1.75 * self.hex_radius) * _)
             )
-            self.screen.blit(text, text_rect)
+            surface.blit(text, text_rect)
 
     def draw(self, strat, current_strategie):
         """Draws the board.
-        
+
         Displays the background and info of the game.
-        
+
         Args:
             strat (int): Playing strategies (is there a human playing ?)
             current_strategie ([type]): Current player strategie
@@ -190,15 +259,23 @@ class UI:
         self._draw_board()
 
     def _draw_board(self):
-        counter = 0
-        for row in range(self.board_size):
-            for column in range(self.board_size):
-                self._draw_hexagon(
-                    self.screen, self.gray,
-                    self._get_coordinates(row, column), counter
-                )
-                counter += 1
-        self._draw_text()
+        """
+        Draws the tiles changed since the last frame on the board, and
+        copies them to the screen.
+        """
+        for node in self.dirty:
+            self._draw_tile(self.board, node)
+            self._restore(node)
+        self.dirty.clear()
+
+    def _restore(self, node: int) -> None:
+        """
+        Copies the area of the tile of node from the board to the
+        screen, erasing what was drawn over it.
+        """
+        area = self.geometry.areas[node]
+        self.screen.blit(self.board, area, area)
+        self.updated.append(area)
 
     def _limit_framerate(self, strat, current_strategie):
         if 'human' in strat:
@@ -216,51 +293,50 @@ class UI:
     # From UI to logic
 
     def _get_coordinates(self, row: int, column: int):
-        x = self.x_offset + (2 * self.hex_radius) * column + self.hex_radius * row
-        y = self.y_offset + (1.75 * self.hex_radius) * row
-
-        return x, y
+        return self.geometry.centers[row * self.board_size + column]
 
     def _get_true_coordinates(self, node: int):
         return int(node / self.board_size), node % self.board_size
 
     def _get_selected_node(self):
-        mouse_pos = pygame.mouse.get_pos()
-        for _, rect in enumerate(self.rects):
-            if rect.collidepoint(mouse_pos):
-                return _
-        return None
+        return self.geometry.node_at(pygame.mouse.get_pos())
 
     def _display_mouse_node_hover(self):
         # Source: https://bit.ly/2Wl5Grz
 
+        # Erase the previous hover
+        if self.hovered is not None:
+            self._restore(self.hovered)
+            self.hovered = None
+
         # Get actual node
         node = self._get_selected_node()
         if node is None:
             return
 
         # Display hovering informations (coordinates)
-        row = int(node / self.board_size)
-        column = node % self.board_size
-        self._draw_hexagon(
-            self.screen, self.black,
-            self._get_coordinates(row, column), node
-        )
+        self.hovered = node
+        gfxdraw.aapolygon(self.screen, self.geometry.outlines[node], self.black)
 
         # Text
-        x, y = self._get_true_coordinates(node)
-        x, y = self._get_coordinates(x, y)
-        alphabet = list(map(chr, range(97, 123)))
-        txt = alphabet[column].upper() + str(row)
-        node_font = pygame.font.SysFont("Sans", 18)
-        foreground = self.black if self.color[node] is self.white else self.white
-        text = node_font.render(txt, True, foreground, self.color[node])
+        text = self._get_label(node)
         text_rect = text.get_rect()
-        text_rect.center = (x, y)
+        text_rect.center = self.geometry.centers[node]
         self.screen.blit(text, text_rect)
 
         return node
 
+    def _get_label(self, node: int) -> pygame.Surface:
+        foreground = self.black if self.color[node] is self.white else self.white
+        key = (node, foreground, self.color[node])
+        if key not in self.labels:
+            row, column = self._get_true_coordinates(node)
+            alphabet = list(map(chr, range(97, 123)))
+            txt = alphabet[column].upper() + str(row)
+            self.labels[key] = self.node_font.render(
+                txt, True, foreground, self.color[node])
+        return self.labels[key]
+
     def handle_events(self, strat: str) -> None:
         """
         Updates UI logic according to mouse events:
@@ -287,7 +363,13 @@ class UI:
                 node_coord = self._get_true_coordinates(selected_node)
                 self.last_clicked_node = node_coord
 
-        pygame.display.update()
+        # Only the areas drawn since the last frame
+        if self.full_update:
+            pygame.display.update()
+            self.full_update = False
+        elif self.updated:
+            pygame.display.update(self.updated)
+        self.updated = []
 
 
     # Update UI representation
@@ -296,7 +378,8 @@ class UI:
                           player: Optional[int]):
         """
         This procedure updates the ui by applying the given action
-        of the player at the given coordinates of the board.
+        of the player at the given coordinates of the board. The tile
+        is drawn with the next frame.
         """
         (x, y) = coordinates
         node = x * self.board_size + y
@@ -308,3 +391,4 @@ class UI:
             self.color[node] = self.player2color[player]
         except KeyError:
             raise KeyError("player is neither white nor black")
+        self.dirty.add(node)
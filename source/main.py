@@ -1,19 +1,12 @@
+import os
 import logging
 import argparse
 
 from typing import Optional
 
-from rich import print
-from rich.logging import RichHandler
-
-FORMAT = "%(message)s"
-logging.basicConfig(
-    level="NOTSET",
-    format=FORMAT,
-    datefmt="[%X]",
-    handlers=[RichHandler()]
-)
-
+from classes.board import backends
+from classes.evaluation import methods as eval_methods
+from classes.stats import StatsLogger, Profiler
 from classes.strategy import str2strat
 from classes.tournament import Tournament
 
@@ -24,7 +17,12 @@ def main(args):
        * the size of the board,
        * the player strategies , i.e., "human", "random", "minimax", .
        * the game counter (why not? though it should be always zero),
-       * the number of games to play.
+       * the number of games to play,
+       * whether the UI is displayed,
+       * the options given to the AI strategies,
+       * the number of games played in parallel,
+       * the file the results are appended to,
+       * the instruments observing the games (cf. stats.py).
 
     If there is only AIs , there is a real competition.
     In contrast, if there's a "human", there is a single match, i.e.,
@@ -59,6 +57,28 @@ def arguments():
         help='GUI is not displayed. Only if no human.'
     )
 
+    parser.add_argument(
+        '--jobs', default=1, type=int,
+        help='Number of games played in parallel, by as many'\
+             ' processes. Only with --no-ui (default: 1)'
+    )
+
+    parser.add_argument(
+        '--results', default=None,
+        help='File the record of each game is appended to: CSV if it'\
+             ' ends with .csv, JSON lines otherwise (default: none)'
+    )
+
+    parser.add_argument(
+        '--stats', action='store_true',
+        help='Log the search counters of each player after each game'
+    )
+    parser.add_argument(
+        '--profile', default=None, metavar='DIR',
+        help='Profile each game with cProfile, saving the statistics'\
+             ' to DIR/game_<number>.prof'
+    )
+
     parser.add_argument(
         '--player', default='human', choices=str2strat,
         help='Strategy for player1 (default: human)'
@@ -67,13 +87,158 @@ def arguments():
         '--other', default='random', choices=str2strat,
         help='Strategy for player2 (default: random)'
     )
+
+    parser.add_argument(
+        '--backend', default='bitboard', choices=backends,
+        help='Board representation used by the search strategies'\
+             ' (default: bitboard)'
+    )
+
+    parser.add_argument(
+        '--tt-size', default=16, type=float,
+        help='Size of the transposition table of the search strategies'\
+             ' in MB, 0 to disable it (default: 16)'
+    )
+
+    parser.add_argument(
+        '--no-ordering', action='store_true',
+        help='Search the moves of minimax and abheur in board order'\
+             ' instead of ordering them (TT move, killers, history)'
+    )
+    parser.add_argument(
+        '--pvs', action='store_true',
+        help='Principal variation search in minimax and abheur'
+    )
+    parser.add_argument(
+        '--lmr', action='store_true',
+        help='Late move reductions in minimax and abheur'
+    )
+
+    parser.add_argument(
+        '--patterns', action='store_true',
+        help='Skip the dead and captured cells in the search'\
+             ' strategies, and answer bridge intrusions first'
+    )
+
+    parser.add_argument(
+        '--symmetry', action='store_true',
+        help='Share the transposition table and evaluation entries of'\
+             ' minimax and abheur between symmetric positions'
+    )
+
+    parser.add_argument(
+        '--eval', default='distance', choices=[*eval_methods, 'network'],
+        help='Evaluation of the leaves of abheur: stones needed to'\
+             ' connect, electrical resistance, or the value of the'\
+             ' --network (default: distance)'
+    )
+    parser.add_argument(
+        '--network', default=None, metavar='DIR',
+        help='Directory of the weights of a policy/value network (cf.'\
+             ' network.py), giving the priors of the moves of MCTS and'\
+             ' the leaf values of abheur with --eval network'
+    )
+
+    parser.add_argument(
+        '--solver-nodes', default=50_000, type=int,
+        help='Node budget of the proof-number solver per move'\
+             ' (default: 50000)'
+    )
+    parser.add_argument(
+        '--endgame', default=None, type=int,
+        help='Let the solver play for every AI once at most this many'\
+             ' cells are empty, and the solver strategy only then'\
+             ' (default: never, and always for the solver strategy)'
+    )
+    parser.add_argument(
+        '--fallback', default='abheur',
+        choices=[s for s in str2strat if s not in ('human', 'solver')],
+        help='Strategy of the solver when it finds no winning move'\
+             ' (default: abheur)'
+    )
+
+    parser.add_argument(
+        '--book', default=None,
+        help='Opening book file the AIs play from while the position is'\
+             ' in it (cf. build_book.py, default: none)'
+    )
+
+    parser.add_argument(
+        '--move-time', default=None, type=float,
+        help='Time budget of the search strategies per move, in seconds'\
+             ' (default: fixed depth)'
+    )
+    parser.add_argument(
+        '--max-nodes', default=None, type=int,
+        help='Node budget of the search strategies per move, for'\
+             ' reproducible runs (default: fixed depth)'
+    )
+
+    parser.add_argument(
+        '--playouts', default=1000, type=int,
+        help='Number of playouts of MCTS and montecarlo per move'\
+             ' (default: 1000)'
+    )
+    parser.add_argument(
+        '--exploration', default=2 ** 0.5, type=float,
+        help='Exploration constant of MCTS (default: sqrt(2))'
+    )
+    parser.add_argument(
+        '--rollout-batch', default=1, type=int,
+        help='Playouts per new leaf of MCTS, run at once with NumPy'\
+             ' (default: 1)'
+    )
+    parser.add_argument(
+        '--workers', default=None, type=int,
+        help='Number of worker processes of mcts_parallel'\
+             ' (default: number of CPUs)'
+    )
+    parser.add_argument(
+        '--parallel', default='root', choices=['root', 'leaf'],
+        help='Parallelisation of mcts_parallel: independent trees'\
+             ' merged at the root, or batches of leaves evaluated by'\
+             ' the workers (default: root)'
+    )
+    parser.add_argument(
+        '--leaf-batch', default=32, type=int,
+        help='Playouts per leaf with --parallel leaf (default: 32)'
+    )
+    parser.add_argument(
+        '--seed', default=None, type=int,
+        help='Seed of the random strategies, for reproducible runs'
+    )
     args = parser.parse_args()
+    if args.eval == 'network' and args.network is None:
+        parser.error('--eval network requires --network')
+    if args.book is not None and not os.path.isfile(args.book):
+        parser.error(f'--book: no such file: {args.book}')
     return args
 
 
-if __name__ == "__main__":
-    log = logging.getLogger("rich")
+def setup_logging(use_rich: bool = True):
+    """
+    Logs through rich when the game is displayed, and through a plain
+    stream handler otherwise: rich's handler imports its tables (for
+    its tracebacks), which headless runs never show. This is only done
+    when running this script, so that processes importing it (e.g.
+    spawned workers) do not load any of it.
+    """
+    FORMAT = "%(message)s"
+    if use_rich:
+        from rich.logging import RichHandler
+        handler = RichHandler()
+    else:
+        handler = logging.StreamHandler()
+        FORMAT = "[%(asctime)s] %(levelname)-8s %(message)s"
+    logging.basicConfig(
+        level="NOTSET",
+        format=FORMAT,
+        datefmt="[%X]" if use_rich else "%X",
+        handlers=[handler]
+    )
 
+
+if __name__ == "__main__":
     args = arguments()
 
     STRAT = [args.player, args.other]
@@ -81,5 +246,40 @@ if __name__ == "__main__":
     GAME_COUNT = 0
     N_GAMES    = args.games
     USE_UI     = 'human' in STRAT or not args.no_ui
+    setup_logging(use_rich=USE_UI)
+    log = logging.getLogger("rich")
+    OPTIONS    = {
+        "backend": args.backend,
+        "tt_size": args.tt_size,
+        "evaluation": args.eval,
+        "network": args.network,
+        "ordering": not args.no_ordering,
+        "pvs": args.pvs,
+        "lmr": args.lmr,
+        "patterns": args.patterns,
+        "symmetry": args.symmetry,
+        "solver_nodes": args.solver_nodes,
+        "endgame": args.endgame,
+        "fallback": args.fallback,
+        "book": args.book,
+        "move_time": args.move_time,
+        "max_nodes": args.max_nodes,
+        "playouts": args.playouts,
+        "exploration": args.exploration,
+        "rollout_batch": args.rollout_batch,
+        "workers": args.workers,
+        "parallel": args.parallel,
+        "leaf_batch": args.leaf_batch,
+        "seed": args.seed,
+    }
+
+    JOBS       = args.jobs
+    RESULTS    = args.results
+    INSTRUMENTS = []
+    if args.stats:
+        INSTRUMENTS.append(StatsLogger())
+    if args.profile is not None:
+        INSTRUMENTS.append(Profiler(args.profile))
 
-    main([ BOARD_SIZE, STRAT, GAME_COUNT, N_GAMES, USE_UI ])
+    main([ BOARD_SIZE, STRAT, GAME_COUNT, N_GAMES, USE_UI, OPTIONS, JOBS,
+           RESULTS, INSTRUMENTS ])
@@ -0,0 +1,77 @@
+import os
+import logging
+import argparse
+
+from classes.evaluation import methods as eval_methods
+from classes.selfplay import self_play
+from classes.strategy import str2strat
+
+
+def arguments():
+    parser = argparse.ArgumentParser(
+        description='Plays games of a strategy against itself and records'
+                    ' their positions, moves, search visits and results'
+                    ' in shards (cf. classes/selfplay.py). Running it'
+                    ' again with the same settings resumes the run.'
+    )
+    parser.add_argument('directory', help='Directory of the shards')
+    parser.add_argument('--size', default=7, type=int,
+                        help='Size of the board (default: 7)')
+    parser.add_argument('--games', default=1000, type=int,
+                        help='Number of games, rounded up to whole shards'
+                             ' (default: 1000)')
+    parser.add_argument('--games-per-shard', default=100, type=int,
+                        help='Games per shard (default: 100)')
+    parser.add_argument('--strategy', default='mcts',
+                        choices=[s for s in str2strat if s != 'human'],
+                        help='Strategy of both players (default: mcts)')
+    parser.add_argument('--jobs', default=os.cpu_count(), type=int,
+                        help='Worker processes (default: number of CPUs)')
+    parser.add_argument('--opening-moves', default=2, type=int,
+                        help='Random moves starting each game, not recorded'
+                             ' (default: 2)')
+    parser.add_argument('--seed', default=0, type=int,
+                        help='Seed of the run, game i being seeded with'
+                             ' seed + i (default: 0)')
+    parser.add_argument('--no-compress', action='store_true',
+                        help='Write directories of .npy files, which can be'
+                             ' memory mapped, instead of .npz files')
+
+    parser.add_argument('--playouts', default=1000, type=int,
+                        help='Playouts of MCTS per move (default: 1000)')
+    parser.add_argument('--exploration', default=2 ** 0.5, type=float,
+                        help='Exploration constant of MCTS'
+                             ' (default: sqrt(2))')
+    parser.add_argument('--move-time', default=None, type=float,
+                        help='Time budget per move, in seconds')
+    parser.add_argument('--max-nodes', default=None, type=int,
+                        help='Node budget of minimax and abheur per move')
+    parser.add_argument('--eval', default='distance',
+                        choices=[*eval_methods, 'network'],
+                        help='Evaluation of abheur (default: distance)')
+    parser.add_argument('--network', default=None, metavar='DIR',
+                        help='Network of MCTS priors and --eval network')
+    args = parser.parse_args()
+    if args.eval == 'network' and args.network is None:
+        parser.error('--eval network requires --network')
+    return args
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level="INFO", format="%(message)s")
+    args = arguments()
+    OPTIONS = {
+        "playouts": args.playouts,
+        "exploration": args.exploration,
+        "move_time": args.move_time,
+        "max_nodes": args.max_nodes,
+        "evaluation": args.eval,
+        "network": args.network,
+    }
+    try:
+        self_play(args.directory, args.size, args.strategy, OPTIONS,
+                  args.games, games_per_shard=args.games_per_shard,
+                  jobs=args.jobs, opening_moves=args.opening_moves,
+                  seed=args.seed, compress=not args.no_compress)
+    except ValueError as error:
+        raise SystemExit(error)
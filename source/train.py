@@ -0,0 +1,64 @@
+import logging
+import argparse
+
+from classes.network import Network
+from classes.training import train
+
+
+def arguments():
+    parser = argparse.ArgumentParser(
+        description='Trains a policy/value network (cf. --network of'
+                    ' main.py) on self-play shards (cf. selfplay.py).'
+    )
+    parser.add_argument('shards', help='Directory of the self-play shards')
+    parser.add_argument('network', help='Directory the trained weights are'
+                                        ' saved to')
+    parser.add_argument('--init', default=None, metavar='DIR',
+                        help='Network to start from (default: random'
+                             ' weights)')
+    parser.add_argument('--channels', default=32, type=int,
+                        help='Channels of a new network (default: 32)')
+    parser.add_argument('--layers', default=4, type=int,
+                        help='Convolutions of a new network (default: 4)')
+    parser.add_argument('--hidden', default=32, type=int,
+                        help='Hidden units of the value head of a new'
+                             ' network (default: 32)')
+    parser.add_argument('--epochs', default=1, type=int,
+                        help='Passes over the shards (default: 1)')
+    parser.add_argument('--batch-size', default=256, type=int,
+                        help='Positions per minibatch (default: 256)')
+    parser.add_argument('--lr', default=0.01, type=float,
+                        help='Learning rate (default: 0.01)')
+    parser.add_argument('--momentum', default=0.9, type=float,
+                        help='Momentum (default: 0.9)')
+    parser.add_argument('--weight-decay', default=1e-4, type=float,
+                        help='L2 penalty of the weights (default: 1e-4)')
+    parser.add_argument('--value-weight', default=1., type=float,
+                        help='Weight of the value loss against the policy'
+                             ' loss (default: 1)')
+    parser.add_argument('--no-augment', action='store_true',
+                        help='Train on the positions as recorded, without'
+                             ' their rotations')
+    parser.add_argument('--seed', default=0, type=int,
+                        help='Seed of the weights and of the order of the'
+                             ' positions (default: 0)')
+    parser.add_argument('--log-every', default=100, type=int,
+                        help='Batches between two reports (default: 100)')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level="INFO", format="%(message)s")
+    args = arguments()
+    if args.init is not None:
+        network = Network.load(args.init)
+    else:
+        network = Network.random(args.channels, args.layers, args.hidden,
+                                 seed=args.seed)
+    network = train(network, args.shards, epochs=args.epochs,
+                    batch_size=args.batch_size, lr=args.lr,
+                    momentum=args.momentum, weight_decay=args.weight_decay,
+                    value_weight=args.value_weight,
+                    augment=not args.no_augment, seed=args.seed,
+                    log_every=args.log_every)
+    network.save(args.network)